@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+
+def is_prime(n: int) -> bool:
+    """
+    Checks whether n is prime by trial division.
+
+    :complexity: O(sqrt(n))
+    """
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return n == 2
+    divisor = 3
+    while divisor * divisor <= n:
+        if n % divisor == 0:
+            return False
+        divisor += 2
+    return True
+
+
+def next_prime(n: int) -> int:
+    """
+    Returns the smallest prime greater than or equal to n.
+
+    :complexity: O(g * sqrt(n)) where g is the gap to the next prime, O(log(n)) on average.
+    """
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+def next_table_size(size: int) -> int:
+    """
+    Returns the table size to grow to once size has been used up:
+    the smallest prime at least double size, like TABLE_SIZES.
+
+    :complexity: See next_prime.
+    """
+    return next_prime(2 * size + 1)
@@ -0,0 +1,81 @@
+""" Multi-threaded throughput of ConcurrentDoubleKeyTable.
+
+Run from the repository root with `python -m benchmarks.bench_concurrent_double_key_table`.
+
+Compares a DoubleKeyTable behind one global lock with the striped
+ConcurrentDoubleKeyTable. On an interpreter with a global interpreter lock,
+only one thread runs Python code at a time, so expect striping to mostly
+save lock contention there, and to scale with threads on a free-threaded build.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+from benchmarks.bench_double_key_table import make_pairs
+from concurrent_double_key_table import ConcurrentDoubleKeyTable
+from double_key_table import DoubleKeyTable
+
+
+class GlobalLockTable:
+    """
+    A DoubleKeyTable with every operation behind a single lock.
+    """
+
+    def __init__(self) -> None:
+        self.table = DoubleKeyTable()
+        self.lock = threading.Lock()
+
+    def __getitem__(self, key):
+        with self.lock:
+            return self.table[key]
+
+    def __setitem__(self, key, data) -> None:
+        with self.lock:
+            self.table[key] = data
+
+
+def worker(table, pairs: list[tuple[str, str]], operations: int, seed: int) -> None:
+    """
+    Mixed workload of 90% gets and 10% sets on existing pairs.
+    """
+    rng = random.Random(seed)
+    for i in range(operations):
+        pair = pairs[rng.randrange(len(pairs))]
+        if i % 10 == 0:
+            table[pair] = i
+        else:
+            table[pair]
+
+
+def throughput(table, pairs: list[tuple[str, str]], threads: int, operations: int) -> float:
+    """
+    Returns the operations per second of threads workers sharing table.
+    """
+    workers = [threading.Thread(target=worker, args=(table, pairs, operations, seed))
+               for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * operations / (time.perf_counter() - start)
+
+
+def bench_threads(n: int = 100000, width: int = 10, operations: int = 50000,
+                  threads: tuple[int, ...] = (1, 2, 4, 8)) -> None:
+    pairs = make_pairs(n, width)
+    print(f"Mixed operations on {len(pairs)} pairs (thousand operations per second)")
+    print(f"{'threads':>8} {'global lock':>12} {'striped':>12}")
+    for count in threads:
+        results = []
+        for table in (GlobalLockTable(), ConcurrentDoubleKeyTable()):
+            for i, pair in enumerate(pairs):
+                table[pair] = i
+            results.append(throughput(table, pairs, count, operations) / 1000)
+        print(f"{count:>8}" + "".join(f" {r:>12.1f}" for r in results))
+
+
+if __name__ == "__main__":
+    bench_threads()
@@ -0,0 +1,189 @@
+""" Benchmarks for DoubleKeyTable.
+
+Run from the repository root with `python -m benchmarks.bench_double_key_table`.
+"""
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+
+from benchmarks.bench_hash_table import make_keys, timed
+from double_key_table import DoubleKeyTable
+from flat_double_key_table import FlatDoubleKeyTable
+from sorted_double_key_table import SortedDoubleKeyTable
+from algorithms.mergesort import mergesort
+from double_key_snapshot import save_snapshot, load_snapshot, MappedDoubleKeyTable
+from data_structures.hashing import string_hash
+
+
+def make_pairs(n: int, width: int, seed: int = 0) -> list[tuple[str, str]]:
+    """
+    Generate n distinct (key1, key2) pairs, with width key2s for each key1.
+    """
+    keys = make_keys(n // width + width, seed)
+    outer = keys[:n // width]
+    inner = keys[n // width:]
+    return [(key1, key2) for key1 in outer for key2 in inner[:width]]
+
+
+def set_all(table: DoubleKeyTable, pairs: list[tuple[str, str]]) -> None:
+    for i, pair in enumerate(pairs):
+        table[pair] = i
+
+
+def get_all(table: DoubleKeyTable, pairs: list[tuple[str, str]]) -> None:
+    for pair in pairs:
+        table[pair]
+
+
+def contains_all(table: DoubleKeyTable, pairs: list[tuple[str, str]]) -> None:
+    for pair in pairs:
+        pair in table
+
+
+def bench_operations(n: int = 100000, width: int = 10) -> None:
+    pairs = make_pairs(n, width)
+    misses = [(key1, key2 + "!") for key1, key2 in pairs]
+    random.Random(0).shuffle(pairs)
+    print(f"Point operations, {len(pairs)} pairs with {width} key2s per key1 (microseconds per operation)")
+    print(f"{'':>16} {'nested':>8} {'flat':>8}")
+    tables = (DoubleKeyTable(), FlatDoubleKeyTable())
+    for name, func, args in (
+        ("set", set_all, pairs),
+        ("get", get_all, pairs),
+        ("contains (hit)", contains_all, pairs),
+        ("contains (miss)", contains_all, misses),
+    ):
+        times = [timed(func, table, args) / len(args) * 1e6 for table in tables]
+        print(f"{name:>16}" + "".join(f" {t:>8.2f}" for t in times))
+
+
+def bench_batches(n: int = 100000, width: int = 10) -> None:
+    pairs = make_pairs(n, width)
+    random.Random(0).shuffle(pairs)
+    items = [(pair, i) for i, pair in enumerate(pairs)]
+    print(f"Batches of {len(pairs)} pairs with {width} key2s per key1 (microseconds per pair)")
+    print(f"{'':>16} {'one by one':>10} {'batch':>10}")
+    single = DoubleKeyTable()
+    batch = DoubleKeyTable()
+    for name, one_by_one, many in (
+        ("set", lambda: set_all(single, pairs), lambda: batch.set_many(items)),
+        ("get", lambda: get_all(single, pairs), lambda: batch.get_many(pairs)),
+    ):
+        times = [timed(func) / len(pairs) * 1e6 for func in (one_by_one, many)]
+        print(f"{name:>16}" + "".join(f" {t:>10.2f}" for t in times))
+
+
+def delete_all(table: DoubleKeyTable, pairs: list[tuple[str, str]]) -> None:
+    for pair in pairs:
+        del table[pair]
+
+
+def bench_wide_deletes(n: int = 100000, widths: tuple[int, ...] = (10, 100, 1000)) -> None:
+    """
+    Delete every pair of tables with more and more key2s per
+    key1. The time per delete should not grow with the inner table size.
+    """
+    print(f"Deleting {n} pairs (microseconds per delete)")
+    for width in widths:
+        pairs = make_pairs(n, width)
+        random.Random(0).shuffle(pairs)
+        table = DoubleKeyTable()
+        set_all(table, pairs)
+        seconds = timed(delete_all, table, pairs)
+        print(f"{width:>10} key2s per key1 {seconds / len(pairs) * 1e6:>8.2f}")
+
+
+def bench_memory(n: int = 100000) -> None:
+    """
+    Compare the slot memory of the nested and compact layouts when most
+    key1s have a single key2, and the rest two.
+    """
+    keys = make_keys(n + 1)
+    pairs = [(key1, keys[-1]) for key1 in keys[:n]] + [(key1, key1) for key1 in keys[:n // 4]]
+    print(f"Slot memory for {n} key1s, a quarter of them with 2 key2s (MiB)")
+    for name, table in (("nested", DoubleKeyTable()), ("compact", DoubleKeyTable(compact=True))):
+        set_all(table, pairs)
+        usage = table.memory_usage()
+        print(f"{name:>16} {usage['total'] / (1 << 20):>8.2f}  ({usage['inner_tables']} inner tables)")
+
+
+def bench_snapshot(n: int = 100000, width: int = 10, lookups: int = 1000) -> None:
+    """
+    Compare the ways a process could get a table at startup: inserting every
+    pair again, loading a snapshot, or mapping the snapshot read-only. Each
+    includes a few lookups, so the mapped table is actually used.
+    """
+    pairs = make_pairs(n, width)
+    random.Random(0).shuffle(pairs)
+    table = DoubleKeyTable()
+    set_all(table, pairs)
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    try:
+        save_snapshot(table, path)
+        print(f"Startup with {len(pairs)} pairs, {os.path.getsize(path) / (1 << 20):.1f} MiB snapshot (seconds)")
+
+        def rebuild():
+            fresh = DoubleKeyTable()
+            set_all(fresh, pairs)
+            get_all(fresh, pairs[:lookups])
+
+        def load():
+            get_all(load_snapshot(path), pairs[:lookups])
+
+        def mapped():
+            with MappedDoubleKeyTable(path) as snapshot:
+                get_all(snapshot, pairs[:lookups])
+
+        for name, func in (("rebuild", rebuild), ("load", load), ("mmap", mapped)):
+            # A new process starts without any cached hashes.
+            string_hash.cache_clear()
+            print(f"{name:>16} {timed(func):>8.3f}")
+    finally:
+        os.remove(path)
+
+
+def bench_sorted(n: int = 100000, width: int = 2, queries: int = 100) -> None:
+    """
+    Compare sorting the top-level keys on every query with reading them off
+    the sorted index, for whole-table and prefix queries.
+    """
+    pairs = make_pairs(n, width)
+    plain = DoubleKeyTable()
+    indexed = SortedDoubleKeyTable()
+    print(f"Sorted queries on {len(pairs) // width} key1s (milliseconds per query)")
+    print(f"{'':>16} {'mergesort':>10} {'index':>10}")
+    print(f"{'insert (total)':>16}" + "".join(f" {timed(set_all, table, pairs) * 1e3:>10.0f}" for table in (plain, indexed)))
+
+    def sort_all(table) -> None:
+        for _ in range(queries):
+            mergesort(table.keys())
+
+    def index_all(table) -> None:
+        for _ in range(queries):
+            table.keys_sorted()
+
+    prefixes = [key1[:2] for key1, _ in pairs[:queries * width:width]]
+
+    def sort_prefix(table) -> None:
+        for prefix in prefixes:
+            [key for key in mergesort(table.keys()) if key.startswith(prefix)]
+
+    def index_prefix(table) -> None:
+        for prefix in prefixes:
+            table.prefix(prefix)
+
+    for name, sort, index in (("all keys", sort_all, index_all), ("prefix", sort_prefix, index_prefix)):
+        times = [timed(sort, plain) / queries * 1e3, timed(index, indexed) / queries * 1e3]
+        print(f"{name:>16}" + "".join(f" {t:>10.2f}" for t in times))
+
+
+if __name__ == "__main__":
+    bench_operations()
+    bench_batches()
+    bench_wide_deletes()
+    bench_memory()
+    bench_snapshot()
+    bench_sorted()
@@ -0,0 +1,100 @@
+""" Benchmarks for LinearProbeTable.
+
+Run from the repository root with `python -m benchmarks.bench_hash_table`.
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from data_structures.hash_table import LinearProbeTable
+from data_structures.probe_policy import LinearProbe, QuadraticProbe, DoubleHashProbe, RobinHoodProbe
+
+
+def make_keys(n: int, seed: int = 0) -> list[str]:
+    """
+    Generate n distinct hostname-like keys.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    keys = set()
+    while len(keys) < n:
+        keys.add("".join(rng.choice(letters) for _ in range(12)))
+    return list(keys)
+
+
+def timed(func, *args) -> float:
+    """
+    Returns the wall time in seconds taken by func(*args).
+    """
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def delete_heavy(table: LinearProbeTable, keys: list[str], rounds: int) -> None:
+    """
+    Fill the table, then repeatedly delete and reinsert half of the keys.
+    """
+    for i, key in enumerate(keys):
+        table[key] = i
+    half = keys[::2]
+    for _ in range(rounds):
+        for key in half:
+            del table[key]
+        for i, key in enumerate(half):
+            table[key] = i
+
+
+def bench_deletion(sizes=(1000, 10000, 100000), rounds: int = 3) -> None:
+    print("Delete-heavy workload (seconds)")
+    print(f"{'entries':>10} {'backshift':>12} {'tombstone':>12}")
+    for n in sizes:
+        keys = make_keys(n)
+        backshift = timed(delete_heavy, LinearProbeTable(deletion=LinearProbeTable.DELETE_BACKSHIFT), keys, rounds)
+        tombstone = timed(delete_heavy, LinearProbeTable(deletion=LinearProbeTable.DELETE_TOMBSTONE), keys, rounds)
+        print(f"{n:>10} {backshift:>12.3f} {tombstone:>12.3f}")
+
+
+def insert_and_lookup(table: LinearProbeTable, keys: list[str]) -> None:
+    """
+    Insert every key, then look each one up.
+    """
+    for i, key in enumerate(keys):
+        table[key] = i
+    for key in keys:
+        table[key]
+
+
+def bench_probe_policies(n: int = 100000) -> None:
+    print(f"Probe policies, {n} entries")
+    print(f"{'policy':>12} {'seconds':>10} {'avg probes':>12} {'max probes':>12}")
+    keys = make_keys(n)
+    for policy in (LinearProbe(), QuadraticProbe(), DoubleHashProbe(), RobinHoodProbe()):
+        table = LinearProbeTable(probe_policy=policy)
+        seconds = timed(insert_and_lookup, table, keys)
+        stats = table.probe_stats()
+        print(f"{policy.name:>12} {seconds:>10.3f} {stats['average']:>12.3f} {stats['max']:>12}")
+
+
+def insert_one_by_one(keys: list[str]) -> LinearProbeTable:
+    table = LinearProbeTable()
+    for i, key in enumerate(keys):
+        table[key] = i
+    return table
+
+
+def bench_bulk_load(sizes=(10000, 100000, 1000000)) -> None:
+    print("Construction (seconds)")
+    print(f"{'entries':>10} {'__setitem__':>12} {'from_items':>12}")
+    for n in sizes:
+        keys = make_keys(n)
+        one_by_one = timed(insert_one_by_one, keys)
+        bulk = timed(LinearProbeTable.from_items, zip(keys, range(n)))
+        print(f"{n:>10} {one_by_one:>12.3f} {bulk:>12.3f}")
+
+
+if __name__ == "__main__":
+    bench_deletion()
+    bench_probe_policies()
+    bench_bulk_load()
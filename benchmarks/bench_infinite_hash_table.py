@@ -0,0 +1,149 @@
+""" Benchmarks for InfiniteHashTable.
+
+Run from the repository root with `python -m benchmarks.bench_infinite_hash_table`.
+"""
+from __future__ import annotations
+
+import random
+import tracemalloc
+
+from algorithms.mergesort import mergesort
+from benchmarks.bench_hash_table import timed
+from data_structures.referential_array import ArrayR
+from infinite_hash_table import InfiniteHashTable
+from radix_infinite_hash_table import RadixInfiniteHashTable
+
+
+def make_hostnames(n: int, prefix_length: int, seed: int = 0) -> list[str]:
+    """
+    Generate n distinct hostname-like keys, sharing a prefix of about
+    prefix_length characters split across a few clusters.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    domain = ".".join("".join(rng.choice(letters) for _ in range(8)) for _ in range(prefix_length // 9 + 1))
+    domain = domain[:prefix_length]
+    clusters = ["node-" + "".join(rng.choice(letters) for _ in range(4)) for _ in range(8)]
+    keys = set()
+    while len(keys) < n:
+        host = rng.choice(clusters) + "-" + "".join(rng.choice(letters) for _ in range(6))
+        keys.add(domain + "." + host)
+    return sorted(keys, key=lambda _: rng.random())
+
+
+class ArrayTable(InfiniteHashTable):
+    """
+    Tables as they were before SparseArrayR: every one allocates a full
+    ArrayR, and has a __dict__.
+    """
+    ARRAY_TYPE = ArrayR
+
+
+def set_all(table: InfiniteHashTable, keys: list[str]) -> None:
+    for i, key in enumerate(keys):
+        table[key] = i
+
+
+def get_all(table: InfiniteHashTable, keys: list[str]) -> None:
+    for key in keys:
+        table[key]
+
+
+def locate_all(table: InfiniteHashTable, keys: list[str]) -> None:
+    for key in keys:
+        table.get_location(key)
+
+
+def delete_all(table: InfiniteHashTable, keys: list[str]) -> None:
+    for key in keys:
+        del table[key]
+
+
+def count_tables(table: InfiniteHashTable) -> int:
+    """
+    Returns the number of tables making up table, itself included.
+    """
+    count = 0
+    stack = [table]
+    while stack:
+        table = stack.pop()
+        count += 1
+        stack.extend(entry[1] for entry in table.array
+                     if entry is not None and isinstance(entry[1], InfiniteHashTable))
+    return count
+
+
+def bench_deep_prefixes(n: int = 20000, prefix_lengths: tuple[int, ...] = (0, 40, 200)) -> None:
+    print(f"Operations on {n} hostnames with long shared prefixes (microseconds per operation)")
+    print(f"{'prefix':>8} {'table':>8} {'set':>8} {'get':>8} {'locate':>8} {'delete':>8} {'tables':>8}")
+    for prefix_length in prefix_lengths:
+        keys = make_hostnames(n, prefix_length)
+        for name, table in (("levels", InfiniteHashTable()), ("radix", RadixInfiniteHashTable())):
+            times = [timed(func, table, keys) / n * 1e6 for func in (set_all, get_all, locate_all)]
+            tables = count_tables(table)
+            times.append(timed(delete_all, table, keys) / n * 1e6)
+            print(f"{prefix_length:>8} {name:>8}" + "".join(f" {t:>8.2f}" for t in times) + f" {tables:>8}")
+
+
+def bench_sort_keys(n: int = 20000, prefix_length: int = 40) -> None:
+    """
+    Compare sort_keys, walking the levels in order, with mergesorting a list of the keys.
+    """
+    keys = make_hostnames(n, prefix_length)
+    table = InfiniteHashTable()
+    set_all(table, keys)
+    print(f"Sorting {n} hostnames (milliseconds)")
+    print(f"{'mergesort':>16} {timed(mergesort, keys) * 1e3:>8.1f}")
+    print(f"{'sort_keys':>16} {timed(table.sort_keys) * 1e3:>8.1f}")
+
+
+def bench_prefix(n: int = 20000, prefix_length: int = 40, limit: int = 10) -> None:
+    """
+    Compare keys_with_prefix and count_prefix with filtering sort_keys, for
+    prefixes running from a whole cluster of hostnames down to a single one.
+    """
+    keys = make_hostnames(n, prefix_length)
+    table = InfiniteHashTable()
+    set_all(table, keys)
+    sample = keys[0]
+    print(f"Prefix queries on {n} hostnames (microseconds per query)")
+    print(f"{'prefix':>8} {'matches':>8} {'filter':>10} {'all':>10} {'first ' + str(limit):>10} {'count':>10}")
+    # Up to the end of the cluster name, part way into the host, and the whole key.
+    for length in (prefix_length + 10, prefix_length + 13, len(sample)):
+        prefix = sample[:length]
+        times = [
+            timed(lambda: [key for key in table.sort_keys() if key.startswith(prefix)]),
+            timed(lambda: list(table.keys_with_prefix(prefix))),
+            timed(lambda: list(table.keys_with_prefix(prefix, limit))),
+            timed(table.count_prefix, prefix),
+        ]
+        print(f"{length:>8} {table.count_prefix(prefix):>8}" + "".join(f" {t * 1e6:>10.1f}" for t in times))
+
+
+def bench_memory(n: int = 1000000, prefix_length: int = 20) -> None:
+    """
+    Compare the memory taken by tables with full arrays and __dict__s, and
+    by the default sparse, slotted ones, as measured by tracemalloc. The
+    keys themselves are allocated before measuring, and tracing slows
+    down the set times.
+    """
+    keys = make_hostnames(n, prefix_length)
+    print(f"Memory of {n} hostnames")
+    print(f"{'table':>8} {'MB':>8} {'bytes/key':>10} {'tables':>8} {'set (s)':>8}")
+    for name, table_type in (("arrays", ArrayTable), ("sparse", InfiniteHashTable),
+                             ("radix", RadixInfiniteHashTable)):
+        table = table_type()
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        seconds = timed(set_all, table, keys)
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        print(f"{name:>8} {used / 1e6:>8.1f} {used / n:>10.1f} {count_tables(table):>8} {seconds:>8.1f}")
+        del table
+
+
+if __name__ == "__main__":
+    bench_deep_prefixes()
+    bench_sort_keys()
+    bench_prefix()
+    bench_memory()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from threading import RLock
+from typing import Iterable, Iterator, TypeVar
+from double_key_table import DoubleKeyTable, InlineTable
+
+K1 = TypeVar('K1')
+K2 = TypeVar('K2')
+V = TypeVar('V')
+
+
+class ConcurrentDoubleKeyTable(DoubleKeyTable[K1, K2, V]):
+    """
+    Double Hash Table that can be shared between threads.
+
+    Top-level keys are spread over STRIPES locks by their built-in hash,
+    which does not depend on the table size, so a key keeps its stripe
+    across resizes. Each inner table is only touched while holding the
+    stripe of its top-level key, so operations on top-level keys in
+    different stripes do not wait for each other.
+
+    Every access to the outer array holds at least one stripe. Anything that
+    changes its layout, adding or removing a top-level key and so any resize,
+    takes every stripe, in order, so it runs while no other operation is
+    looking at the outer array. Setting, getting and deleting the pairs of
+    an existing top-level key, including resizing its inner table, only
+    needs its own stripe.
+
+    Iterating takes every stripe and returns a copy, so the keys and values
+    seen are consistent with each other. Incremental rehashing moves outer
+    slots on every operation, so it is not supported.
+    """
+
+    STRIPES = 16
+
+    def __init__(self, *args, stripes: int | None = None, **kwargs) -> None:
+        """
+        Initialise the Hash Table. Any other arguments are passed on to
+        DoubleKeyTable, see its constructor.
+
+        :raises ValueError: when incremental_rehash is set, or stripes is not positive.
+        """
+        super().__init__(*args, **kwargs)
+        if self.incremental_rehash:
+            raise ValueError("Incremental rehashing is not supported when shared between threads")
+        if stripes is not None:
+            self.STRIPES = stripes
+        if self.STRIPES <= 0:
+            raise ValueError("There must be at least one stripe")
+        self.locks = [RLock() for _ in range(self.STRIPES)]
+
+    def _stripe(self, key1: K1) -> RLock:
+        """
+        Returns the lock guarding key1.
+        """
+        return self.locks[hash(key1) % len(self.locks)]
+
+    @contextmanager
+    def _all_stripes(self) -> Iterator[None]:
+        """
+        Hold every stripe, taken in order so two threads cannot deadlock.
+
+        :complexity: O(STRIPES)
+        """
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+
+    def __contains__(self, key: tuple[K1, K2]) -> bool:
+        """
+        :complexity: See DoubleKeyTable.__contains__.
+        """
+        key1, key2 = key
+        with self._stripe(key1):
+            sub_table = self._find_sub_table(key1)
+            return sub_table is not None and key2 in sub_table
+
+    def __getitem__(self, key: tuple[K1, K2]) -> V:
+        """
+        :complexity: See DoubleKeyTable.__getitem__.
+        :raises KeyError: when the key doesn't exist.
+        """
+        key1, key2 = key
+        with self._stripe(key1):
+            return self._sub_table(key1)[key2]
+
+    def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
+        """
+        Only a new top-level key takes every stripe.
+
+        :complexity: See DoubleKeyTable.__setitem__.
+        """
+        key1, key2 = key
+        with self._stripe(key1):
+            sub_table = self._find_sub_table(key1)
+            if sub_table is not None and not sub_table.is_empty():
+                if isinstance(sub_table, InlineTable) and not sub_table.fits([key2]):
+                    sub_table = self._promote(key1, sub_table)
+                sub_table[key2] = data
+                return
+        with self._all_stripes():
+            super().__setitem__(key, data)
+
+    def __delitem__(self, key: tuple[K1, K2]) -> None:
+        """
+        Only deleting the last pair of a top-level key takes every stripe.
+
+        :complexity: See DoubleKeyTable.__delitem__.
+        :raises KeyError: when the key doesn't exist.
+        """
+        key1, key2 = key
+        with self._stripe(key1):
+            array, position = self._locate(key1)
+            if array is None:
+                raise KeyError(key1)
+            sub_table = array[position][1]
+            if len(sub_table) > 1:
+                del sub_table[key2]
+                self._demote(array, position)
+                return
+        with self._all_stripes():
+            super().__delitem__(key)
+
+    def set_many(self, items: Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        :complexity: See DoubleKeyTable.set_many.
+        """
+        with self._all_stripes():
+            super().set_many(items)
+
+    def get_many(self, keys: Iterable[tuple[K1, K2]]) -> list[V]:
+        """
+        :complexity: See DoubleKeyTable.get_many.
+        :raises KeyError: when a key doesn't exist.
+        """
+        with self._all_stripes():
+            return super().get_many(keys)
+
+    def delete_many(self, keys: Iterable[tuple[K1, K2]]) -> None:
+        """
+        :complexity: See DoubleKeyTable.delete_many.
+        :raises KeyError: when a key doesn't exist.
+        """
+        with self._all_stripes():
+            super().delete_many(keys)
+
+    def iter_keys(self, key: K1 | None = None) -> Iterator[K1 | K2]:
+        """
+        :complexity: O(N) to create, see DoubleKeyTable.iter_keys.
+        :raises KeyError: when key is not None and not in the table.
+        """
+        with self._all_stripes():
+            return iter(list(super().iter_keys(key)))
+
+    def iter_values(self, key: K1 | None = None) -> Iterator[V]:
+        """
+        :complexity: O(N) to create, see DoubleKeyTable.iter_values.
+        :raises KeyError: when key is not None and not in the table.
+        """
+        with self._all_stripes():
+            return iter(list(super().iter_values(key)))
+
+    def iter_items(self) -> Iterator[tuple[K1, K2, V]]:
+        """
+        :complexity: O(N) to create, see DoubleKeyTable.iter_items.
+        """
+        with self._all_stripes():
+            return iter(list(super().iter_items()))
+
+    def memory_usage(self) -> dict:
+        """
+        :complexity: See DoubleKeyTable.memory_usage.
+        """
+        with self._all_stripes():
+            return super().memory_usage()
+
+    def __str__(self) -> str:
+        with self._all_stripes():
+            return super().__str__()
@@ -1,18 +1,35 @@
 """ Hash Table ADT
 
-Defines a Hash Table using Linear Probing for conflict resolution.
+Defines a Hash Table using open addressing for conflict resolution.
+Linear Probing is used unless another ProbePolicy is given.
 """
 from __future__ import annotations
 __author__ = 'Jackson Goerner'
 __since__ = '07/02/2023'
 
 
-from typing import TypeVar, Generic
-from data_structures.referential_array import ArrayR
+import random
+import time
+from array import array
+from itertools import compress
+from typing import TypeVar, Generic, Iterable, Iterator
+from data_structures.referential_array import ArrayR, TypedArrayR
+from data_structures.hashing import string_hash, MASK_64
+from data_structures.probe_policy import ProbePolicy, LinearProbe
+from algorithms.primes import next_table_size
 
 K = TypeVar('K')
 V = TypeVar('V')
 
+# Slot states stored in LinearProbeTable.state_array.
+EMPTY = 0
+OCCUPIED = 1
+DELETED = 2
+
+# Translation table turning state_array into 1 for OCCUPIED slots and 0 otherwise.
+OCCUPIED_MASK = bytes(1 if state == OCCUPIED else 0 for state in range(256))
+
+
 class FullError(Exception):
     pass
 
@@ -26,6 +43,35 @@ class LinearProbeTable(Generic[K, V]):
                 Otherwise `hash` should be overwritten.
         - V:    Value Type.
 
+    Entries are kept in parallel arrays rather than as (key, value) tuples:
+        - key_array:    the key stored in each slot.
+        - value_array:  the value stored in each slot. A TypedArrayR when the
+                        table is given a value_typecode, for numeric values.
+        - hash_array:   the cached full hash of each key, compared before the keys themselves.
+        - probe_array:  how many probes past its home position each key sits.
+        - state_array:  one byte per slot, EMPTY, OCCUPIED or DELETED.
+    hash_array and probe_array are raw typed arrays, whose contents are only
+    meaningful in OCCUPIED slots. Values are also read from the raw array
+    underneath value_array, as state_array already says which slots are
+    taken, so a typed value equal to TypedArrayR's empty sentinel (such as
+    NaN) still reads back as itself.
+
+    Probe Policies (chosen at construction, see probe_policy.py):
+        LinearProbe (default), QuadraticProbe, DoubleHashProbe or RobinHoodProbe.
+
+    Deletion Strategies (chosen at construction):
+        - DELETE_BACKSHIFT: empty the slot and reinsert the rest of its cluster.
+                            Only for policies where probe_policy.supports_backshift.
+        - DELETE_TOMBSTONE: mark the slot DELETED. Tombstones are skipped by lookups,
+                            reused by inserts and dropped when the table is rehashed.
+                            Not available with Robin Hood probing.
+
+    Resizing:
+        The table grows along TABLE_SIZES once more than max_load_factor of it is used,
+        and shrinks back down once less than min_load_factor of it holds entries
+        (0 disables shrinking). With extend_sizes, primes beyond the end of
+        TABLE_SIZES are generated when needed, otherwise the table stops growing.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
@@ -33,34 +79,131 @@ class LinearProbeTable(Generic[K, V]):
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
     HASH_BASE = 31
+    HASH_SEED = 31415
+
+    DELETE_BACKSHIFT = "backshift"
+    DELETE_TOMBSTONE = "tombstone"
 
-    def __init__(self, sizes=None) -> None:
+    # Rehashing compacts at the same size, rather than growing, while the
+    # live entries alone fill no more than this fraction of max_load_factor.
+    # The rest of what went over the limit is tombstones.
+    COMPACT_RATIO = 0.5
+
+    MAX_LOAD_FACTOR = 0.5
+    MIN_LOAD_FACTOR = 0.125
+
+    def __init__(self, sizes=None, deletion: str | None = None, probe_policy: ProbePolicy | None = None,
+                 max_load_factor: float | None = None, min_load_factor: float | None = None,
+                 extend_sizes: bool | None = None, track_stats: bool = False,
+                 value_typecode: str | None = None) -> None:
         """
         Initialise the Hash Table.
+
+        With value_typecode, values are stored unboxed in a TypedArrayR of that
+        typecode (e.g. "q" for ints or "d" for floats) instead of an ArrayR.
+
+        With track_stats, the probe length of every lookup is counted for stats().
+
+        By default deletion uses backshifting when the probe policy supports it,
+        and tombstones otherwise, and TABLE_SIZES is only extended when no
+        sizes are given.
+
+        :raises ValueError: when deletion is not a known strategy,
+                            or not supported by the probe policy,
+                            or the load factors are not 0 <= min < max < 1,
+                            or max is above the probe policy's max_load_factor.
         """
+        if extend_sizes is None:
+            extend_sizes = sizes is None
         if sizes is not None:
             self.TABLE_SIZES = sizes
+        self.extend_sizes = extend_sizes
+        if max_load_factor is not None:
+            self.MAX_LOAD_FACTOR = max_load_factor
+        if min_load_factor is not None:
+            self.MIN_LOAD_FACTOR = min_load_factor
+        if not 0 <= self.MIN_LOAD_FACTOR < self.MAX_LOAD_FACTOR < 1:
+            raise ValueError("Load factors must satisfy 0 <= min < max < 1")
+        if probe_policy is None:
+            probe_policy = LinearProbe()
+        if deletion is None:
+            deletion = self.DELETE_BACKSHIFT if probe_policy.supports_backshift else self.DELETE_TOMBSTONE
+        if deletion not in (self.DELETE_BACKSHIFT, self.DELETE_TOMBSTONE):
+            raise ValueError("Unknown deletion strategy " + str(deletion))
+        if deletion == self.DELETE_BACKSHIFT and not probe_policy.supports_backshift:
+            raise ValueError(probe_policy.name + " probing requires tombstone deletion")
+        if deletion == self.DELETE_TOMBSTONE and probe_policy.robin_hood:
+            raise ValueError(probe_policy.name + " probing requires backshift deletion")
+        if self.MAX_LOAD_FACTOR > probe_policy.max_load_factor:
+            raise ValueError(probe_policy.name + " probing requires max_load_factor <= "
+                             + str(probe_policy.max_load_factor))
+        self.probe_policy = probe_policy
+        self.deletion = deletion
+        self.value_typecode = value_typecode
         self.size_index = 0
-        self.array:ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZES[self.size_index])
+        self._allocate(self.TABLE_SIZES[self.size_index])
         self.count = 0
+        self.tombstones = 0
+        self.rehash_count = 0
+        self.rehash_time = 0.0
+        self.track_stats = track_stats
+        # [lookups, total probes, longest probe] for each outcome.
+        self.lookup_counters = {"successful": [0, 0, 0], "unsuccessful": [0, 0, 0]}
+
+    def _allocate(self, size: int) -> None:
+        """
+        Replace the storage with empty arrays of the given size.
+
+        :complexity: O(size)
+        """
+        self.key_array: ArrayR[K] = ArrayR(size)
+        if self.value_typecode is None:
+            self.value_array: ArrayR[V] | TypedArrayR[V] = ArrayR(size)
+        else:
+            self.value_array = TypedArrayR(size, self.value_typecode)
+        self.hash_array = array("Q", bytes(8 * size))
+        self.probe_array = array("L", bytes(array("L").itemsize * size))
+        self.state_array = bytearray(size)
+
+    def full_hash(self, key: K) -> int:
+        """
+        Hash a key independently of the table size.
+
+        This is the value cached in hash_array, so it must be an unsigned 64-bit integer.
+        Keys that are not strings fall back to Python's hash, so a table with
+        `hash` overwritten for them still works.
+
+        :complexity: O(len(key)) the first time a key is hashed, O(1) afterwards.
+        """
+        if isinstance(key, str):
+            return string_hash(key, self.HASH_SEED, self.HASH_BASE)
+        return hash(key) & MASK_64
 
     def hash(self, key: K) -> int:
         """
         Hash a key for insert/retrieve/update into the hashtable.
 
-        :complexity: O(len(key))
+        :complexity: See full_hash.
         """
-
-        value = 0
-        a = 31415
-        for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
-        return value
+        return self.full_hash(key) % self.table_size
 
     @property
     def table_size(self) -> int:
-        return len(self.array)
+        return len(self.state_array)
+
+    def _size_at(self, index: int) -> int | None:
+        """
+        Returns TABLE_SIZES[index], extending TABLE_SIZES with further primes
+        if needed and allowed, or None if the table cannot grow that far.
+
+        :complexity: O(1) unless a new prime is generated, see next_table_size.
+        """
+        if index >= len(self.TABLE_SIZES) and self.extend_sizes:
+            # Extend a copy, so the class's list is left alone.
+            self.TABLE_SIZES = self.TABLE_SIZES + [next_table_size(self.TABLE_SIZES[-1])]
+        if index < len(self.TABLE_SIZES):
+            return self.TABLE_SIZES[index]
+        return None
 
     def __len__(self) -> int:
         """
@@ -70,57 +213,141 @@ class LinearProbeTable(Generic[K, V]):
 
     def _linear_probe(self, key: K, is_insert: bool) -> int:
         """
-        Find the correct position for this key in the hash table using linear probing.
+        Find the correct position for this key in the hash table by following
+        the probe policy (linear probing unless configured otherwise).
+
+        :complexity: See _probe.
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        return self._probe(key, is_insert)[0]
+
+    def _probe(self, key: K, is_insert: bool, key_hash: int | None = None) -> tuple[int, int]:
+        """
+        Find the correct position for this key, and how many probes past
+        its home position that is. key_hash is the key's full_hash, if the
+        caller already has it.
+
+        The cached hash of each occupied slot is compared before the key, so
+        keys are only compared for equality when their full hashes agree.
+        Tombstones are probed past, but an insert of a new key reuses the
+        first one it passed. With Robin Hood probing the search stops at the
+        first entry closer to its home than the key would be, as the key
+        cannot be further along. Inserts of a new key return that position.
+
         :complexity best: O(hash(key)) first position is empty
         :complexity worst: O(hash(key) + N*comp(K)) when we've searched the entire table
                         where N is the tablesize
         :raises KeyError: When the key is not in the table, but is_insert is False.
         :raises FullError: When a table is full and cannot be inserted.
         """
-        # Initial position
-        position = self.hash(key)
-
-        for _ in range(self.table_size):
-            if self.array[position] is None:
+        if key_hash is None:
+            key_hash = self.full_hash(key)
+        states = self.state_array
+        size = len(states)
+        home = key_hash % size if self._default_hash() else self.hash(key)
+        robin_hood = self.probe_policy.robin_hood
+        tombstone = None
+
+        for distance, position in enumerate(self.probe_policy.sequence(home, key_hash, size)):
+            state = states[position]
+            if state == EMPTY:
                 # Empty spot. Am I upserting or retrieving?
                 if is_insert:
-                    return position
+                    return (position, distance) if tombstone is None else tombstone
                 else:
+                    if self.track_stats:
+                        self._count_lookup("unsuccessful", distance + 1)
                     raise KeyError(key)
-            elif self.array[position][0] == key:
-                return position
-            else:
-                # Taken by something else. Time to linear probe.
-                position = (position + 1) % self.table_size
+            elif state == DELETED:
+                if tombstone is None:
+                    tombstone = (position, distance)
+            elif self.hash_array[position] == key_hash and self.key_array[position] == key:
+                if self.track_stats and not is_insert:
+                    self._count_lookup("successful", distance + 1)
+                return (position, distance)
+            elif robin_hood and self.probe_array[position] < distance:
+                if is_insert:
+                    return (position, distance)
+                else:
+                    if self.track_stats:
+                        self._count_lookup("unsuccessful", distance + 1)
+                    raise KeyError(key)
+            # Taken by something else. Time to probe.
 
         if is_insert:
+            if tombstone is not None:
+                return tombstone
             raise FullError("Table is full!")
         else:
+            if self.track_stats:
+                self._count_lookup("unsuccessful", size)
             raise KeyError(key)
 
+    def _count_lookup(self, outcome: str, probes: int) -> None:
+        """
+        Add a lookup that took the given number of probes to the counters for its outcome.
+        """
+        counter = self.lookup_counters[outcome]
+        counter[0] += 1
+        counter[1] += probes
+        if probes > counter[2]:
+            counter[2] = probes
+
+    def _occupied(self) -> list[int]:
+        """
+        Returns the positions of all occupied slots, in slot order.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        return list(compress(range(self.table_size), self.state_array.translate(OCCUPIED_MASK)))
+
     def keys(self) -> list[K]:
         """
         Returns all keys in the hash table.
 
+        The occupied slots are selected from the underlying array in one
+        pass of itertools.compress, without indexing each slot from Python.
+
         :complexity: O(N) where N is self.table_size.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][0])
-        return res
+        return list(compress(self.key_array.array, self.state_array.translate(OCCUPIED_MASK)))
 
     def values(self) -> list[V]:
         """
         Returns all values in the hash table.
 
-        :complexity: O(N) where N is self.table_size.
+        :complexity: See keys.
+        """
+        return list(compress(self.value_array.array, self.state_array.translate(OCCUPIED_MASK)))
+
+    def iter_items(self) -> Iterator[tuple[K, V]]:
+        """
+        Returns an iterator of all (key, value) pairs in the hash table,
+        found as the iterator is consumed.
+
+        :complexity: O(N) at worst for each pair, where N is self.table_size.
+        """
+        states = self.state_array
+        for position in range(len(states)):
+            if states[position] == OCCUPIED:
+                yield (self.key_array[position], self.value_array.array[position])
+
+    def iter_keys(self) -> Iterator[K]:
+        """
+        Returns an iterator of all keys in the hash table.
+
+        :complexity: See iter_items.
+        """
+        return (key for key, _ in self.iter_items())
+
+    def iter_values(self) -> Iterator[V]:
+        """
+        Returns an iterator of all values in the hash table.
+
+        :complexity: See iter_items.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][1])
-        return res
+        return (value for _, value in self.iter_items())
 
     def __contains__(self, key: K) -> bool:
         """
@@ -142,8 +369,46 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises KeyError: when the key doesn't exist.
         """
-        position = self._linear_probe(key, False)
-        return self.array[position][1]
+        position = self._probe(key, False)[0]
+        return self.value_array.array[position]
+
+    def _store(self, position: int, key: K, data: V, key_hash: int, distance: int) -> None:
+        """
+        Write an entry into the given slot of every parallel array.
+        """
+        self.key_array[position] = key
+        self.value_array[position] = data
+        self.hash_array[position] = key_hash
+        self.probe_array[position] = distance
+        self.state_array[position] = OCCUPIED
+
+    def _robin_hood_store(self, position: int, key: K, data: V, key_hash: int, distance: int) -> None:
+        """
+        Store an entry at position, carrying along whatever was there until
+        it finds an empty slot. The carried entry takes the slot of any entry
+        that is closer to its own home.
+
+        :complexity: O(N) where N is the length of the cluster after position.
+        """
+        states = self.state_array
+        size = len(states)
+        while states[position] == OCCUPIED:
+            if self.probe_array[position] < distance:
+                carried = (self.key_array[position], self.value_array.array[position],
+                           self.hash_array[position], self.probe_array[position])
+                self._store(position, key, data, key_hash, distance)
+                key, data, key_hash, distance = carried
+            position = (position + 1) % size
+            distance += 1
+        self._store(position, key, data, key_hash, distance)
+
+    def _clear(self, position: int) -> None:
+        """
+        Empty the given slot, dropping the references it held.
+        """
+        self.key_array[position] = None
+        self.value_array[position] = None
+        self.state_array[position] = EMPTY
 
     def __setitem__(self, key: K, data: V) -> None:
         """
@@ -152,39 +417,271 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises FullError: when the table cannot be resized further.
         """
+        self._insert(key, data)
 
-        position = self._linear_probe(key, True)
+        if len(self) + self.tombstones > self.table_size * self.MAX_LOAD_FACTOR:
+            self._rehash()
 
-        if self.array[position] is None:
-            self.count += 1
+    def _insert(self, key: K, data: V) -> None:
+        """
+        Insert or update a (key, value) pair without checking the load factor.
 
-        self.array[position] = (key, data)
+        :complexity: See linear probe.
+        :raises FullError: when there is no free slot left.
+        """
+        key_hash = self.full_hash(key)
+        position, distance = self._probe(key, True, key_hash)
+
+        if self.state_array[position] == OCCUPIED:
+            if self.hash_array[position] == key_hash and self.key_array[position] == key:
+                # Update in place, the key and its hash are unchanged.
+                self.value_array[position] = data
+                return
+            # Robin Hood: take the slot and move its entry onwards.
+            self._robin_hood_store(position, key, data, key_hash, distance)
+        else:
+            if self.state_array[position] == DELETED:
+                self.tombstones -= 1
+            self._store(position, key, data, key_hash, distance)
+        self.count += 1
+
+    def update(self, items: Iterable[tuple[K, V]]) -> None:
+        """
+        Set every (key, value) pair in items.
 
-        if len(self) > self.table_size / 2:
+        The table is grown once, to the first size that can hold all of the
+        pairs, before any are inserted. The load factor is not checked again
+        until all of them are in.
+
+        :complexity: O(R + M*linear_probe) where R is the cost of one _rebuild and M is len(items).
+        :raises FullError: when the table cannot be resized far enough.
+        """
+        items = list(items)
+        needed = self.count + self.tombstones + len(items)
+        size_index = self.size_index
+        new_size = self.table_size
+        while needed > new_size * self.MAX_LOAD_FACTOR:
+            next_size = self._size_at(size_index + 1)
+            if next_size is None:
+                break
+            size_index += 1
+            new_size = next_size
+        if size_index != self.size_index:
+            self.size_index = size_index
+            self._rebuild(new_size)
+
+        for key, data in items:
+            self._insert(key, data)
+
+        if len(self) + self.tombstones > self.table_size * self.MAX_LOAD_FACTOR:
             self._rehash()
 
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[K, V]], *args, **kwargs) -> LinearProbeTable[K, V]:
+        """
+        Build a table holding every (key, value) pair in items. Any other
+        arguments are passed on to the constructor.
+
+        :complexity: See update.
+        """
+        table = cls(*args, **kwargs)
+        table.update(items)
+        return table
+
     def __delitem__(self, key: K) -> None:
         """
         Deletes a (key, value) pair in our hash table.
 
-        :complexity best: O(hash(key)) deleting item is not probed and in correct spot.
+        :complexity best: O(hash(key)) deleting item is not probed and in correct spot,
+                        or the table uses tombstones.
         :complexity worst: O(N*hash(key)+N^2*comp(K)) deleting item is midway through large chain.
         :raises KeyError: when the key doesn't exist.
         """
+        self._delete(key)
+
+        if self.count < self.table_size * self.MIN_LOAD_FACTOR:
+            self._shrink()
+
+    def delete_many(self, keys: Iterable[K]) -> None:
+        """
+        Delete every key in keys.
+
+        The load factor is only checked once all of them are gone, and the
+        table then shrinks straight to the smallest size that fits.
+
+        :complexity: O(M*linear_probe + R) where R is the cost of one _rebuild and M is len(keys).
+        :raises KeyError: when a key doesn't exist. The keys before it are deleted.
+        """
+        for key in keys:
+            self._delete(key)
+
+        size_index = self.size_index
+        new_size = self.table_size
+        while size_index > 0 and self.count < new_size * self.MIN_LOAD_FACTOR:
+            next_size = self.TABLE_SIZES[size_index - 1]
+            if self.count + 1 > next_size * self.MAX_LOAD_FACTOR:
+                break
+            size_index -= 1
+            new_size = next_size
+        if size_index != self.size_index:
+            self.size_index = size_index
+            self._rebuild(new_size)
+
+    def _delete(self, key: K) -> None:
+        """
+        Delete a (key, value) pair without checking the load factor.
+
+        :complexity: See __delitem__.
+        :raises KeyError: when the key doesn't exist.
+        """
         position = self._linear_probe(key, False)
-        # Remove the element
-        self.array[position] = None
         self.count -= 1
-        # Start moving over the cluster
+        # Remove the element
+        self._clear(position)
+        if self.deletion == self.DELETE_TOMBSTONE:
+            self.state_array[position] = DELETED
+            self.tombstones += 1
+        elif self.probe_policy.robin_hood:
+            self._shift_back(position)
+        else:
+            self._reinsert_cluster(position)
+
+    def _reinsert_cluster(self, position: int) -> None:
+        """
+        Reinsert every entry in the cluster following the emptied slot at
+        position, so none of them are cut off from their home position.
+
+        :complexity: O(N*hash(K) + N^2*comp(K)) where N is the length of the cluster.
+        """
         position = (position + 1) % self.table_size
-        while self.array[position] is not None:
-            key2, value = self.array[position]
-            self.array[position] = None
+        while self.state_array[position] == OCCUPIED:
+            key2 = self.key_array[position]
+            value = self.value_array.array[position]
+            key_hash = self.hash_array[position]
+            self._clear(position)
             # Reinsert.
-            newpos = self._linear_probe(key2, True)
-            self.array[newpos] = (key2, value)
+            newpos, distance = self._probe(key2, True, key_hash)
+            self._store(newpos, key2, value, key_hash, distance)
             position = (position + 1) % self.table_size
 
+    def _shift_back(self, position: int) -> None:
+        """
+        Fill the emptied slot at position by moving each following entry of
+        the cluster back one slot, until one is already in its home position.
+        Robin Hood ordering is preserved, so no reinsertion is needed.
+
+        :complexity: O(N) where N is the length of the cluster after position.
+        """
+        states = self.state_array
+        size = len(states)
+        following = (position + 1) % size
+        while states[following] == OCCUPIED and self.probe_array[following] > 0:
+            self._store(position, self.key_array[following], self.value_array.array[following],
+                        self.hash_array[following], self.probe_array[following] - 1)
+            self._clear(following)
+            position = following
+            following = (following + 1) % size
+
+    def probe_stats(self) -> dict:
+        """
+        Reports how many probes a successful lookup of each stored key takes.
+
+        :returns: A dictionary with the probe policy's name, and the average
+                  and maximum probe length (1 when a key is in its home position).
+        :complexity: O(N) where N is self.table_size.
+        """
+        lengths = [self.probe_array[x] + 1 for x in self._occupied()]
+        return {
+            "policy": self.probe_policy.name,
+            "average": sum(lengths) / len(lengths) if lengths else 0.0,
+            "max": max(lengths, default=0),
+        }
+
+    def stats(self) -> dict:
+        """
+        Reports how well the keys are spread over the table.
+
+        :returns: A dictionary with:
+            - size, count, tombstones and load_factor (count / size).
+            - rehashes and rehash_time, the number of rebuilds and total seconds spent in them.
+            - successful, the probe lengths of the stored keys, see probe_stats.
+            - unsuccessful, the average and maximum probe length of a search
+              for an absent key, taken over every home position. The rest of
+              that key's full hash, which sets the step of double hashing, is
+              drawn at random for each home position. With Robin Hood probing
+              the search stops early, as it does in _probe.
+            - clusters, a histogram mapping the length of each run of
+              non-empty slots to the number of such runs.
+            - lookups, only with track_stats, the number, average and maximum
+              probe length of the lookups made so far, for each outcome.
+        :complexity: O(N * P) where N is self.table_size and P is the average unsuccessful probe length.
+        """
+        states = self.state_array
+        size = len(states)
+        sequence = self.probe_policy.sequence
+        robin_hood = self.probe_policy.robin_hood
+        rng = random.Random(self.HASH_SEED)
+
+        misses = []
+        for home in range(size):
+            key_hash = home + size * rng.randrange((MASK_64 - home) // size + 1)
+            probes = size
+            for distance, position in enumerate(sequence(home, key_hash, size)):
+                if states[position] == EMPTY or (robin_hood and states[position] == OCCUPIED
+                                                 and self.probe_array[position] < distance):
+                    probes = distance + 1
+                    break
+            misses.append(probes)
+
+        clusters = {}
+        if EMPTY not in states:
+            clusters[size] = 1
+        else:
+            # Start just after an empty slot, so no cluster wraps around the start.
+            start = states.index(EMPTY)
+            run = 0
+            for i in range(1, size + 1):
+                if states[(start + i) % size] == EMPTY:
+                    if run > 0:
+                        clusters[run] = clusters.get(run, 0) + 1
+                    run = 0
+                else:
+                    run += 1
+
+        result = {
+            "size": size,
+            "count": self.count,
+            "tombstones": self.tombstones,
+            "load_factor": self.count / size,
+            "rehashes": self.rehash_count,
+            "rehash_time": self.rehash_time,
+            "successful": self.probe_stats(),
+            "unsuccessful": {"average": sum(misses) / size, "max": max(misses)},
+            "clusters": clusters,
+        }
+        if self.track_stats:
+            result["lookups"] = {
+                outcome: {
+                    "lookups": lookups,
+                    "average": total / lookups if lookups else 0.0,
+                    "max": longest,
+                }
+                for outcome, (lookups, total, longest) in self.lookup_counters.items()
+            }
+        return result
+
+    def memory_usage(self) -> int:
+        """
+        Returns the number of bytes taken by the slot arrays, not counting
+        the keys and values they refer to.
+
+        :complexity: O(1)
+        """
+        return (self.key_array.memory_usage() + self.value_array.memory_usage()
+                + self.hash_array.itemsize * len(self.hash_array)
+                + self.probe_array.itemsize * len(self.probe_array)
+                + len(self.state_array))
+
     def is_empty(self) -> bool:
         return self.count == 0
 
@@ -195,21 +692,86 @@ class LinearProbeTable(Generic[K, V]):
         """
         Need to resize table and reinsert all values
 
+        When the live entries fill no more than COMPACT_RATIO of what
+        max_load_factor allows, the tombstones are compacted away at the
+        current size instead of growing the table.
+
         :complexity best: O(N*hash(K)) No probing.
         :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
         Where N is len(self)
         """
-        old_array = self.array
-        self.size_index += 1
-        if self.size_index >= len(self.TABLE_SIZES):
-            # Cannot be resized further.
+        if self.count <= self.COMPACT_RATIO * self.MAX_LOAD_FACTOR * self.table_size:
+            new_size = self.table_size
+        else:
+            new_size = self._size_at(self.size_index + 1)
+            if new_size is None:
+                # Cannot be resized further.
+                return
+            self.size_index += 1
+        self._rebuild(new_size)
+
+    def _shrink(self) -> None:
+        """
+        Move down to the previous table size, if the entries fit in it
+        without going over max_load_factor.
+
+        :complexity: See _rebuild.
+        """
+        if self.size_index == 0:
             return
-        self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
-        for item in old_array:
-            if item is not None:
-                key, value = item
-                self[key] = value
+        new_size = self.TABLE_SIZES[self.size_index - 1]
+        if self.count + 1 > new_size * self.MAX_LOAD_FACTOR:
+            return
+        self.size_index -= 1
+        self._rebuild(new_size)
+
+    def _rebuild(self, new_size: int) -> None:
+        """
+        Move all entries into a fresh table of new_size, dropping tombstones.
+
+        Entries are written straight into the new arrays rather than through
+        __setitem__: the keys are known to be unique, so no keys are compared,
+        the count does not change and the load factor is not rechecked.
+        Unless `hash` has been overwritten, home positions come from the
+        cached full hashes, so no key is hashed again. The live entries are
+        pulled out of the old arrays in bulk, see keys.
+
+        :complexity best: O(N) No probing.
+        :complexity worst: O(N^2) Lots of probing.
+        Where N is len(self)
+        """
+        start = time.perf_counter()
+        old_keys = self.keys()
+        old_values = self.values()
+        old_hashes = list(compress(self.hash_array, self.state_array.translate(OCCUPIED_MASK)))
+        cached_home = self._default_hash()
+        self._allocate(new_size)
+        self.tombstones = 0
+        states = self.state_array
+        sequence = self.probe_policy.sequence
+        robin_hood = self.probe_policy.robin_hood
+
+        for key, value, key_hash in zip(old_keys, old_values, old_hashes):
+            home = key_hash % new_size if cached_home else self.hash(key)
+            if robin_hood:
+                self._robin_hood_store(home, key, value, key_hash, 0)
+                continue
+            for distance, position in enumerate(sequence(home, key_hash, new_size)):
+                if states[position] == EMPTY:
+                    self._store(position, key, value, key_hash, distance)
+                    break
+            else:
+                raise FullError("Table is full!")
+
+        self.rehash_count += 1
+        self.rehash_time += time.perf_counter() - start
+
+    def _default_hash(self) -> bool:
+        """
+        Whether `hash` is still full_hash reduced modulo the table size,
+        i.e. it has not been overwritten on this table or a subclass.
+        """
+        return "hash" not in self.__dict__ and type(self).hash is LinearProbeTable.hash
 
     def __str__(self) -> str:
         """
@@ -218,8 +780,6 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: O(N * (str(key) + str(value))) where N is the table size
         """
         result = ""
-        for item in self.array:
-            if item is not None:
-                (key, value) = item
-                result += "(" + str(key) + "," + str(value) + ")\n"
+        for x in self._occupied():
+            result += "(" + str(self.key_array[x]) + "," + str(self.value_array.array[x]) + ")\n"
         return result
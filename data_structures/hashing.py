@@ -0,0 +1,37 @@
+""" String hashing shared by the hash tables.
+
+Computes a polynomial hash of a key that does not depend on the size of
+the table it is stored in. Tables reduce it modulo their current size, so
+the O(len(key)) loop over the characters only runs the first time a key
+is seen. Results are memoised in a bounded least-recently-used cache, so
+hot keys and rehashes of recently used keys cost a dictionary lookup.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+# Maximum number of (key, seed, base) combinations remembered at once.
+HASH_CACHE_SIZE = 1 << 16
+
+HASH_BASE = 31
+
+MASK_64 = (1 << 64) - 1
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def string_hash(key: str, seed: int, base: int = HASH_BASE) -> int:
+    """
+    Hash a key into an unsigned 64-bit integer.
+
+    The polynomial is finished with a multiply/xorshift mix so that the
+    low bits used by `value % table_size` depend on every character.
+
+    :complexity: O(len(key)) the first time a key is seen, O(1) afterwards.
+    """
+    value = seed
+    for char in key:
+        value = (value * base + ord(char)) & MASK_64
+    value ^= value >> 33
+    value = (value * 0xff51afd7ed558ccd) & MASK_64
+    value ^= value >> 33
+    return value
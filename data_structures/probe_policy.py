@@ -0,0 +1,94 @@
+""" Probe Policies
+
+Defines the order in which LinearProbeTable visits slots when resolving
+collisions. Each policy turns a key's home position into the sequence of
+positions to probe.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import Iterator
+
+
+class ProbePolicy(ABC):
+    """
+    Abstract probe policy.
+
+    Attributes:
+        - name:                 Name reported by LinearProbeTable.probe_stats.
+        - supports_backshift:   Whether deleted slots can be refilled by reinserting
+                                the rest of their cluster. This only holds when the
+                                probe sequences of neighbouring slots overlap, as in
+                                linear probing. Other policies must use tombstones.
+        - robin_hood:           Whether inserts displace entries closer to their home.
+        - max_load_factor:      The highest max_load_factor a table can use with this
+                                policy and still always find a free slot.
+    """
+
+    name = "abstract"
+    supports_backshift = False
+    robin_hood = False
+    max_load_factor = 1.0
+
+    @abstractmethod
+    def sequence(self, home: int, key_hash: int, size: int) -> Iterator[int]:
+        """
+        Returns the positions to probe for a key, starting at its home position.
+
+        :complexity: O(1) to create, each position is then produced in O(1).
+        """
+        pass
+
+
+class LinearProbe(ProbePolicy):
+    """ Probe home, home + 1, home + 2, ... """
+
+    name = "linear"
+    supports_backshift = True
+
+    def sequence(self, home: int, key_hash: int, size: int) -> Iterator[int]:
+        return chain(range(home, size), range(home))
+
+
+class QuadraticProbe(ProbePolicy):
+    """
+    Probe home, home + 1, home + 4, home + 9, ...
+
+    With a prime table size at most half full, an empty slot is always found.
+    """
+
+    name = "quadratic"
+    max_load_factor = 0.5
+
+    def sequence(self, home: int, key_hash: int, size: int) -> Iterator[int]:
+        return ((home + i * i) % size for i in range(size))
+
+
+class DoubleHashProbe(ProbePolicy):
+    """
+    Probe home, home + step, home + 2*step, ...
+
+    The step is taken from the bits of the key's hash not used by its home
+    position, so keys sharing a home position follow different sequences.
+    With a prime table size every slot is visited.
+    """
+
+    name = "double"
+
+    def sequence(self, home: int, key_hash: int, size: int) -> Iterator[int]:
+        step = 1 + (key_hash // size) % (size - 1) if size > 1 else 1
+        return ((home + i * step) % size for i in range(size))
+
+
+class RobinHoodProbe(LinearProbe):
+    """
+    Linear probing where an insert takes the slot of any entry that is closer
+    to its own home than the new key is, and carries that entry onwards.
+
+    This keeps probe lengths even, and lets lookups stop early once they pass
+    an entry closer to home than the key being searched for would be.
+    """
+
+    name = "robin hood"
+    robin_hood = True
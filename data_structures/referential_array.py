@@ -12,12 +12,37 @@ space to hold the references.
 Note that while I do check the precondition in __init__ (noone else
 would), I do not check that of getitem or setitem, since that is already
 checked by self.array[index].
+
+The py_object array starts out holding NULL pointers, which cannot be
+read back, so every slot is set to None. This is done with a single slice
+assignment from [None] * length, which ctypes copies in C, rather than by
+building the list element by element in Python.
+
+Slices, iteration, fill and copy_from all work on many slots with one
+call into ctypes, so callers moving lots of data do not need to index each
+slot from Python.
+
+TypedArrayR is a drop-in alternative for numeric contents. It is backed by
+a typed array from the standard library's array module, so each slot holds
+a raw machine number (8 bytes for the default typecodes) rather than a
+reference to a Python object. Empty slots hold a sentinel value, which is
+read back as None.
+
+SparseArrayR is a drop-in alternative for arrays where most slots are
+empty. Up to SMALL_SIZE objects are kept in two small tuples, of their
+positions in order and of the objects themselves, and only once there are
+more is a full ArrayR allocated. It goes back to the tuples when it empties
+down to SHRINK_SIZE objects, lower than SMALL_SIZE so a slot filled and
+emptied at the boundary does not reallocate every time.
 """
+from __future__ import annotations
 __author__ = "Julian Garcia for the __init__ code, Maria Garcia de la Banda for the rest"
 __docformat__ = 'reStructuredText'
 
-from ctypes import py_object
-from typing import TypeVar, Generic
+from array import array
+from bisect import bisect
+from ctypes import py_object, sizeof
+from typing import TypeVar, Generic, Iterator
 
 T = TypeVar('T')
 
@@ -31,7 +56,7 @@ class ArrayR(Generic[T]):
         if length <= 0:
             raise ValueError("Array length should be larger than 0.")
         self.array = (length * py_object)() # initialises the space
-        self.array[:] =  [None for _ in range(length)]
+        self.array[:] = [None] * length
 
     def __len__(self) -> int:
         """ Returns the length of the array
@@ -39,17 +64,239 @@ class ArrayR(Generic[T]):
         """
         return len(self.array)
 
-    def __getitem__(self, index: int) -> T:
-        """ Returns the object in position index.
-        :complexity: O(1)
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        """ Returns the object in position index, or a list of the objects in a slice.
+        :complexity: O(1) for an index, O(k) for a slice of k positions
         :pre: index in between 0 and length - self.array[] checks it
         """
         return self.array[index]
 
-    def __setitem__(self, index: int, value: T) -> None:
-        """ Sets the object in position index to value
-        :complexity: O(1)
+    def __setitem__(self, index: int | slice, value: T | list[T]) -> None:
+        """ Sets the object in position index to value, or each position of a
+        slice to the matching element of a sequence of the same length
+        :complexity: O(1) for an index, O(k) for a slice of k positions
         :pre: index in between 0 and length - self.array[] checks it
         """
         self.array[index] = value
 
+    def __iter__(self) -> Iterator[T]:
+        """ Iterates over the objects in order
+        :complexity: O(1) per object
+        """
+        return iter(self.array)
+
+    def fill(self, value: T, start: int = 0, stop: int | None = None) -> None:
+        """ Sets every position from start up to stop to value
+        :complexity: O(stop - start)
+        """
+        if stop is None:
+            stop = len(self.array)
+        self.array[start:stop] = [value] * (stop - start)
+
+    def copy_from(self, other: ArrayR[T], start: int = 0, other_start: int = 0, length: int | None = None) -> None:
+        """ Copies length objects from other, beginning at other_start, into
+        this array beginning at start. By default all of other is copied.
+        :complexity: O(length)
+        :pre: both ranges lie within their arrays
+        """
+        if length is None:
+            length = len(other) - other_start
+        self.array[start:start + length] = other.array[other_start:other_start + length]
+
+    def memory_usage(self) -> int:
+        """ Returns the number of bytes taken by the slots, not the objects they refer to
+        :complexity: O(1)
+        """
+        return sizeof(self.array)
+
+
+class TypedArrayR(Generic[T]):
+    # Sentinels marking empty slots for the default typecodes.
+    SENTINELS = {"q": -(1 << 63), "Q": (1 << 64) - 1, "d": float("nan")}
+
+    def __init__(self, length: int, typecode: str = "q", sentinel=None) -> None:
+        """ Creates an array of numbers of the given typecode and length, all empty
+        :complexity: O(length) for best/worst case to initialise to the sentinel
+        :pre: length > 0, and sentinel is given unless typecode is in SENTINELS
+        """
+        if length <= 0:
+            raise ValueError("Array length should be larger than 0.")
+        if sentinel is None:
+            sentinel = self.SENTINELS[typecode]
+        self.typecode = typecode
+        self.sentinel = sentinel
+        self.array = array(typecode, [sentinel]) * length
+
+    def _is_sentinel(self, value) -> bool:
+        """ Returns whether value marks an empty slot. NaN is never equal to itself.
+        :complexity: O(1)
+        """
+        return value == self.sentinel or (value != value and self.sentinel != self.sentinel)
+
+    def __len__(self) -> int:
+        """ Returns the length of the array
+        :complexity: O(1)
+        """
+        return len(self.array)
+
+    def __getitem__(self, index: int) -> T | None:
+        """ Returns the number in position index, or None if it is empty.
+        :complexity: O(1)
+        :pre: index in between 0 and length - self.array[] checks it
+        """
+        value = self.array[index]
+        if self._is_sentinel(value):
+            return None
+        return value
+
+    def __setitem__(self, index: int, value: T | None) -> None:
+        """ Sets the number in position index to value, or empties it if value is None
+        :complexity: O(1)
+        :pre: index in between 0 and length - self.array[] checks it
+        """
+        self.array[index] = self.sentinel if value is None else value
+
+    def __iter__(self) -> Iterator[T | None]:
+        """ Iterates over the numbers in order, with None for empty positions
+        :complexity: O(1) per number
+        """
+        for value in self.array:
+            yield None if self._is_sentinel(value) else value
+
+    def fill(self, value: T | None, start: int = 0, stop: int | None = None) -> None:
+        """ Sets every position from start up to stop to value, or empties them if value is None
+        :complexity: O(stop - start)
+        """
+        if stop is None:
+            stop = len(self.array)
+        if value is None:
+            value = self.sentinel
+        self.array[start:stop] = array(self.typecode, [value]) * (stop - start)
+
+    def copy_from(self, other: TypedArrayR[T], start: int = 0, other_start: int = 0, length: int | None = None) -> None:
+        """ Copies length numbers from other, beginning at other_start, into
+        this array beginning at start. By default all of other is copied.
+        :complexity: O(length)
+        :pre: both ranges lie within their arrays, and other has the same typecode and sentinel
+        """
+        if length is None:
+            length = len(other) - other_start
+        self.array[start:start + length] = other.array[other_start:other_start + length]
+
+    def memory_usage(self) -> int:
+        """ Returns the number of bytes taken by the slots
+        :complexity: O(1)
+        """
+        return self.array.itemsize * len(self.array)
+
+
+class SparseArrayR(Generic[T]):
+    SMALL_SIZE = 4
+    SHRINK_SIZE = 2
+
+    __slots__ = ("length", "size", "positions", "objects", "array")
+
+    def __init__(self, length: int) -> None:
+        """ Creates an array of references to objects of the given length, all None
+        :complexity: O(1)
+        :pre: length > 0
+        """
+        if length <= 0:
+            raise ValueError("Array length should be larger than 0.")
+        self.length = length
+        self.size = 0
+        self.positions: tuple[int, ...] = ()
+        self.objects: tuple[T, ...] = ()
+        self.array: ArrayR[T] | None = None
+
+    def __len__(self) -> int:
+        """ Returns the length of the array
+        :complexity: O(1)
+        """
+        return self.length
+
+    def __getitem__(self, index: int) -> T | None:
+        """ Returns the object in position index
+        :complexity: O(SMALL_SIZE)
+        :pre: index in between 0 and length, only checked once the full array is allocated
+        """
+        if self.array is not None:
+            return self.array[index]
+        if index in self.positions:
+            return self.objects[self.positions.index(index)]
+        return None
+
+    def __setitem__(self, index: int, value: T | None) -> None:
+        """ Sets the object in position index to value, or empties it if value is None
+        :complexity: O(SMALL_SIZE) while the tuples are used, O(length) when
+                     switching between them and the full array.
+        :pre: index in between 0 and length, only checked once the full array is allocated
+        """
+        if self.array is not None:
+            old = self.array[index]
+            self.array[index] = value
+            self.size += (value is not None) - (old is not None)
+            if self.size <= self.SHRINK_SIZE:
+                self._shrink()
+        elif index in self.positions:
+            i = self.positions.index(index)
+            if value is None:
+                self.positions = self.positions[:i] + self.positions[i + 1:]
+                self.objects = self.objects[:i] + self.objects[i + 1:]
+                self.size -= 1
+            else:
+                self.objects = self.objects[:i] + (value,) + self.objects[i + 1:]
+        elif value is not None:
+            if self.size == self.SMALL_SIZE:
+                self._grow()
+                self.array[index] = value
+            else:
+                i = bisect(self.positions, index)
+                self.positions = self.positions[:i] + (index,) + self.positions[i:]
+                self.objects = self.objects[:i] + (value,) + self.objects[i:]
+            self.size += 1
+
+    def _grow(self) -> None:
+        """ Moves the objects from the tuples into a full array
+        :complexity: O(length)
+        """
+        self.array = ArrayR(self.length)
+        for index, value in zip(self.positions, self.objects):
+            self.array[index] = value
+        self.positions = self.objects = ()
+
+    def _shrink(self) -> None:
+        """ Moves the objects from the full array back into the tuples
+        :complexity: O(length)
+        """
+        items = [(index, value) for index, value in enumerate(self.array) if value is not None]
+        self.positions = tuple(index for index, _ in items)
+        self.objects = tuple(value for _, value in items)
+        self.array = None
+
+    def __iter__(self) -> Iterator[T | None]:
+        """ Iterates over the objects in order, with None for empty positions
+        :complexity: O(1) per object
+        """
+        if self.array is not None:
+            return iter(self.array)
+        slots = [None] * self.length
+        for index, value in zip(self.positions, self.objects):
+            slots[index] = value
+        return iter(slots)
+
+    def items(self) -> Iterator[tuple[int, T]]:
+        """ Iterates over the (position, object) pairs of the positions that are not None, in order
+        :complexity: O(SMALL_SIZE) while the tuples are used, otherwise O(length)
+        """
+        if self.array is not None:
+            return ((index, value) for index, value in enumerate(self.array) if value is not None)
+        return zip(self.positions, self.objects)
+
+    def memory_usage(self) -> int:
+        """ Returns the number of bytes taken by the slots, not the objects they refer to
+        :complexity: O(1)
+        """
+        if self.array is not None:
+            return self.array.memory_usage()
+        return sizeof(py_object) * 2 * self.size
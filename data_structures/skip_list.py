@@ -0,0 +1,164 @@
+""" Skip List
+
+Defines a sorted set as a skip list: a sorted linked list where each node
+also links forward on a random number of higher levels, so a search can
+skip over most of the list. Searching, adding and removing a key take
+O(log N) on average, and the keys can be walked in order from any point.
+"""
+from __future__ import annotations
+
+import random
+from typing import Generic, Iterator, TypeVar
+
+K = TypeVar('K')
+
+
+class SkipNode(Generic[K]):
+    """
+    A key, and the next node on each of its levels.
+    """
+
+    __slots__ = ("key", "forward")
+
+    def __init__(self, key: K | None, level: int) -> None:
+        self.key = key
+        self.forward: list[SkipNode[K] | None] = [None] * level
+
+
+class SkipList(Generic[K]):
+    """
+    Sorted set of mutually comparable keys.
+
+    Unless stated otherwise, all methods have O(log N) complexity on
+    average, where N is len(self).
+    """
+
+    MAX_LEVEL = 32
+    # Chance a node also appears on the level above.
+    PROMOTE_PROBABILITY = 0.5
+
+    def __init__(self, seed: int | None = None) -> None:
+        """
+        Create an empty skip list. Levels are drawn from a generator seeded
+        with seed, so a given seed always builds the same shape.
+        """
+        self.head: SkipNode[K] = SkipNode(None, self.MAX_LEVEL)
+        self.level = 1
+        self.count = 0
+        self.random = random.Random(seed)
+
+    def _random_level(self) -> int:
+        """
+        :complexity: O(1) on average.
+        """
+        level = 1
+        while level < self.MAX_LEVEL and self.random.random() < self.PROMOTE_PROBABILITY:
+            level += 1
+        return level
+
+    def _predecessors(self, key: K) -> list[SkipNode[K]]:
+        """
+        Returns, for each level, the last node whose key is less than key.
+        """
+        update = [self.head] * self.MAX_LEVEL
+        node = self.head
+        for level in range(self.level - 1, -1, -1):
+            following = node.forward[level]
+            while following is not None and following.key < key:
+                node = following
+                following = node.forward[level]
+            update[level] = node
+        return update
+
+    def add(self, key: K) -> bool:
+        """
+        Add key, returning whether it was not already there.
+        """
+        update = self._predecessors(key)
+        following = update[0].forward[0]
+        if following is not None and following.key == key:
+            return False
+
+        level = self._random_level()
+        self.level = max(self.level, level)
+        node = SkipNode(key, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+        self.count += 1
+        return True
+
+    def discard(self, key: K) -> bool:
+        """
+        Remove key if it is there, returning whether it was.
+        """
+        update = self._predecessors(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return False
+
+        for i in range(len(node.forward)):
+            update[i].forward[i] = node.forward[i]
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+        self.count -= 1
+        return True
+
+    def remove(self, key: K) -> None:
+        """
+        :raises KeyError: when key is not in the list.
+        """
+        if not self.discard(key):
+            raise KeyError(key)
+
+    def __contains__(self, key: K) -> bool:
+        node = self._predecessors(key)[0].forward[0]
+        return node is not None and node.key == key
+
+    def iter_from(self, key: K) -> Iterator[K]:
+        """
+        Returns an iterator of the keys not less than key, in order.
+
+        :complexity: O(log N) to find the first key, O(1) for each key after it.
+        """
+        node = self._predecessors(key)[0].forward[0]
+        while node is not None:
+            yield node.key
+            node = node.forward[0]
+
+    def range(self, low: K, high: K) -> Iterator[K]:
+        """
+        Returns an iterator of the keys from low up to, but not including, high, in order.
+
+        :complexity: O(log N + k) where k is the number of keys returned.
+        """
+        for key in self.iter_from(low):
+            if not key < high:
+                return
+            yield key
+
+    def prefix(self, prefix: str) -> Iterator[str]:
+        """
+        Returns an iterator of the string keys starting with prefix, in order.
+
+        :complexity: O(log N + k) where k is the number of keys returned.
+        """
+        for key in self.iter_from(prefix):
+            if not key.startswith(prefix):
+                return
+            yield key
+
+    def __iter__(self) -> Iterator[K]:
+        """
+        :complexity: O(1) for each key.
+        """
+        node = self.head.forward[0]
+        while node is not None:
+            yield node.key
+            node = node.forward[0]
+
+    def __len__(self) -> int:
+        """
+        :complexity: O(1)
+        """
+        return self.count
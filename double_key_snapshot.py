@@ -0,0 +1,358 @@
+""" Binary snapshots of a DoubleKeyTable.
+
+A snapshot records the slot layout of the outer table and of every inner
+table, together with the cached full hash of every bottom-level key, so it
+can be loaded back without hashing a single key or running any rehash.
+load_snapshot rebuilds an ordinary DoubleKeyTable from it, while
+MappedDoubleKeyTable answers lookups straight from a memory mapped snapshot,
+comparing keys in place and only unpickling the values it returns.
+
+Keys must be strings, hashed with the default hash1 and hash2. Values are
+stored pickled. All integers are unsigned 64-bit little-endian.
+
+Reading a value back unpickles it, and unpickling crafted data can run
+arbitrary code. Only load or map snapshots from a trusted source.
+
+Layout:
+    - Header: MAGIC, hash seed, hash base, outer table size and count.
+    - Outer slots: the offset of each slot's entry, or 0 when it is empty.
+    - Entries: key1, the inner table size and count, then the offset,
+      full hash and probe distance of each inner slot. An inline entry of
+      a compact table has size 0 and a single slot.
+    - Records: key2 and the pickled value, both prefixed by their length.
+"""
+from __future__ import annotations
+
+import mmap
+import pickle
+import struct
+from typing import Iterator
+from double_key_table import DoubleKeyTable, InlineTable
+from data_structures.hashing import string_hash
+from data_structures.referential_array import ArrayR
+
+MAGIC = b"DKT\x01"
+HEADER = struct.Struct("<4sQQQQ")
+OFFSET = struct.Struct("<Q")
+INNER = struct.Struct("<QQ")
+SLOT = struct.Struct("<QQQ")
+
+
+def _pack_bytes(out: bytearray, data: bytes) -> None:
+    out += OFFSET.pack(len(data))
+    out += data
+
+
+def save_snapshot(table: DoubleKeyTable, path: str) -> None:
+    """
+    Write a snapshot of table to path, finishing any incremental rehash first.
+
+    :complexity: O(N + M) where N is the Outer table size and M is the total Inner table size.
+    :raises ValueError: when hash1 or hash2 has been overwritten, or a key is not a string.
+    """
+    if not (table._default_hash1() and table._default_hash2()):
+        raise ValueError("Only tables using the default hash1 and hash2 can be snapshotted")
+    table._finish_migration()
+
+    out = bytearray(HEADER.pack(MAGIC, table.HASH_SEED, table.HASH_BASE, table.table_size, table.count))
+    outer_start = len(out)
+    out += bytes(OFFSET.size * table.table_size)
+
+    for position, item in enumerate(table.array):
+        if item is None:
+            continue
+        key1, sub_table = item
+        if not isinstance(key1, str):
+            raise ValueError("Snapshot keys must be strings")
+        OFFSET.pack_into(out, outer_start + OFFSET.size * position, len(out))
+        _pack_bytes(out, key1.encode())
+
+        if isinstance(sub_table, InlineTable):
+            size = 0
+            slots = [(0, sub_table.key, sub_table.value, 0, 0)]
+        else:
+            size = sub_table.table_size
+            slots = [(i, sub_table.key_array[i], sub_table.value_array.array[i],
+                      sub_table.hash_array[i], sub_table.probe_array[i])
+                     for i in sub_table._occupied()]
+        out += INNER.pack(size, len(sub_table))
+        slots_start = len(out)
+        out += bytes(SLOT.size * max(1, size))
+
+        for i, key2, value, key_hash, distance in slots:
+            if not isinstance(key2, str):
+                raise ValueError("Snapshot keys must be strings")
+            SLOT.pack_into(out, slots_start + SLOT.size * i, len(out), key_hash, distance)
+            _pack_bytes(out, key2.encode())
+            _pack_bytes(out, pickle.dumps(value))
+
+    with open(path, "wb") as file:
+        file.write(out)
+
+
+def _size_index(table, size: int) -> int:
+    """
+    Returns the index of size in the table sizes of table, extending them if allowed.
+
+    :raises ValueError: when size is not one of them.
+    """
+    index = 0
+    while True:
+        current = table._size_at(index)
+        if current is None or current > size:
+            raise ValueError("Table size " + str(size) + " is not one of the table's sizes")
+        if current == size:
+            return index
+        index += 1
+
+
+def load_snapshot(path: str, *args, **kwargs) -> DoubleKeyTable:
+    """
+    Rebuild the DoubleKeyTable saved at path, putting every entry straight
+    back into its slot. Any other arguments are passed on to the constructor,
+    and should match those of the saved table.
+    Every value is unpickled, so only load snapshots from a trusted source.
+
+    :complexity: O(N + M) where N is the Outer table size and M is the total Inner table size.
+    :raises ValueError: when the file is not a snapshot, or does not fit the table's sizes or hash.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    snapshot = _Snapshot(memoryview(data))
+
+    table = DoubleKeyTable(*args, **kwargs)
+    if (table.HASH_SEED, table.HASH_BASE) != (snapshot.seed, snapshot.base):
+        raise ValueError("The snapshot was hashed with a different seed or base")
+    table.size_index = _size_index(table, snapshot.size)
+    table.array = ArrayR(snapshot.size)
+    table.count = snapshot.count
+
+    for position in range(snapshot.size):
+        entry = snapshot.entry(position)
+        if entry == 0:
+            continue
+        key1, size, count, slots = snapshot.read_entry(entry)
+        if size == 0:
+            key2, value = snapshot.read_record(SLOT.unpack_from(snapshot.data, slots)[0])
+            sub_table = InlineTable(key2, value)
+        else:
+            sub_table = table._new_sub_table()
+            sub_table.size_index = _size_index(sub_table, size)
+            sub_table._allocate(size)
+            for i in range(size):
+                record, key_hash, distance = SLOT.unpack_from(snapshot.data, slots + SLOT.size * i)
+                if record != 0:
+                    key2, value = snapshot.read_record(record)
+                    sub_table._store(i, key2, value, key_hash, distance)
+            sub_table.count = count
+        table.array[position] = (key1, sub_table)
+    return table
+
+
+class _Snapshot:
+    """
+    Reads the parts of a snapshot held in a buffer.
+    """
+
+    def __init__(self, data) -> None:
+        self.data = data
+        magic, self.seed, self.base, self.size, self.count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a DoubleKeyTable snapshot")
+
+    def entry(self, position: int) -> int:
+        """
+        Returns the offset of the entry in the given outer slot, or 0 if it is empty.
+        """
+        return OFFSET.unpack_from(self.data, HEADER.size + OFFSET.size * position)[0]
+
+    def key_at(self, offset: int) -> tuple[memoryview, int]:
+        """
+        Returns the bytes of the key at offset, without copying them, and the offset after it.
+        """
+        length = OFFSET.unpack_from(self.data, offset)[0]
+        start = offset + OFFSET.size
+        return self.data[start:start + length], start + length
+
+    def read_entry(self, offset: int) -> tuple[str, int, int, int]:
+        """
+        Returns key1, the inner table size and count, and the offset of the
+        inner slots of the entry at offset.
+        """
+        key1, offset = self.key_at(offset)
+        size, count = INNER.unpack_from(self.data, offset)
+        return str(key1, "utf-8"), size, count, offset + INNER.size
+
+    def read_record(self, offset: int) -> tuple[str, object]:
+        """
+        Returns the key2 and unpickled value of the record at offset.
+        Unpickling can run arbitrary code, so the snapshot must be trusted.
+        """
+        key2, offset = self.key_at(offset)
+        value, _ = self.key_at(offset)
+        return str(key2, "utf-8"), pickle.loads(value)
+
+
+class MappedDoubleKeyTable(_Snapshot):
+    """
+    Read-only DoubleKeyTable backed by a memory mapped snapshot.
+
+    Opening the table reads nothing but the header. Lookups probe the mapped
+    slots directly, comparing keys against the mapped bytes, and only the
+    value being returned is unpickled. As unpickling crafted data can run
+    arbitrary code, only map snapshots from a trusted source.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(memoryview(self.map))
+
+    def close(self) -> None:
+        """
+        Unmap the snapshot. The table cannot be used afterwards.
+        """
+        self.data.release()
+        self.map.close()
+
+    def __enter__(self) -> MappedDoubleKeyTable:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _find_entry(self, key1: str) -> tuple[int, int, int] | None:
+        """
+        Returns the inner table size, count and slots offset for key1, or None if it is not in the table.
+
+        :complexity: O(hash(key1) + N*len(key1)) where N is the Outer table size.
+        """
+        encoded = key1.encode()
+        position = string_hash(key1, self.seed, self.base) % self.size
+        for _ in range(self.size):
+            entry = self.entry(position)
+            if entry == 0:
+                return None
+            stored, offset = self.key_at(entry)
+            if stored == encoded:
+                size, count = INNER.unpack_from(self.data, offset)
+                return size, count, offset + INNER.size
+            position = (position + 1) % self.size
+        return None
+
+    def _find_record(self, key: tuple[str, str]) -> int:
+        """
+        Returns the offset of the record for (key1, key2), or 0 if it is not in the table.
+
+        :complexity: O(hash(key1) + hash(key2) + (N + M)*len(key)) where N is
+                     the Outer table size and M is the Inner table size.
+        """
+        key1, key2 = key
+        found = self._find_entry(key1)
+        if found is None:
+            return 0
+        size, _, slots = found
+        encoded = key2.encode()
+        if size == 0:
+            record = SLOT.unpack_from(self.data, slots)[0]
+            return record if self.key_at(record)[0] == encoded else 0
+
+        key_hash = string_hash(key2, self.seed, self.base)
+        position = key_hash % size
+        for _ in range(size):
+            record, stored_hash, _ = SLOT.unpack_from(self.data, slots + SLOT.size * position)
+            if record == 0:
+                return 0
+            if stored_hash == key_hash and self.key_at(record)[0] == encoded:
+                return record
+            position = (position + 1) % size
+        return 0
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        """
+        :complexity: See _find_record.
+        """
+        return self._find_record(key) != 0
+
+    def __getitem__(self, key: tuple[str, str]) -> object:
+        """
+        :complexity: See _find_record.
+        :raises KeyError: when the key doesn't exist.
+        """
+        record = self._find_record(key)
+        if record == 0:
+            raise KeyError(key)
+        return self.read_record(record)[1]
+
+    def _iter_entries(self) -> Iterator[tuple[str, int, int, int]]:
+        """
+        Returns an iterator of key1, the inner table size and count, and the
+        offset of the inner slots for every top-level key.
+        """
+        for position in range(self.size):
+            entry = self.entry(position)
+            if entry != 0:
+                yield self.read_entry(entry)
+
+    def _iter_records(self, key1: str | None = None) -> Iterator[tuple[str, int]]:
+        """
+        Returns an iterator of (key1, record offset) for every pair, or only
+        those of key1 if it is given.
+
+        :raises KeyError: when key1 is not None and not in the table.
+        """
+        if key1 is None:
+            entries = self._iter_entries()
+        else:
+            found = self._find_entry(key1)
+            if found is None:
+                raise KeyError(key1)
+            entries = [(key1, *found)]
+        for key1, size, _, slots in entries:
+            for i in range(max(1, size)):
+                record = SLOT.unpack_from(self.data, slots + SLOT.size * i)[0]
+                if record != 0:
+                    yield key1, record
+
+    def keys(self, key: str | None = None) -> list[str]:
+        """
+        key = None: returns all top-level keys in the table.
+        key = x: returns all bottom-level keys for top-level key x.
+
+        :complexity: O(N) with key = None, where N is the Outer table size, otherwise O(M) where M is the Inner table size.
+        :raises KeyError: when key is not None and not in the table.
+        """
+        if key is None:
+            return [key1 for key1, _, _, _ in self._iter_entries()]
+        return [str(self.key_at(record)[0], "utf-8") for _, record in self._iter_records(key)]
+
+    def values(self, key: str | None = None) -> list:
+        """
+        key = None: returns all values in the table.
+        key = x: returns all values for top-level key x.
+
+        :complexity: O(N + M) where N is the Outer table size and M is the total Inner table size.
+        :raises KeyError: when key is not None and not in the table.
+        """
+        return [self.read_record(record)[1] for _, record in self._iter_records(key)]
+
+    def iter_items(self) -> Iterator[tuple[str, str, object]]:
+        """
+        Returns an iterator of all (key1, key2, value) triples in the table.
+
+        :complexity: O(N + M) overall, see values.
+        """
+        for key1, record in self._iter_records():
+            yield (key1, *self.read_record(record))
+
+    @property
+    def table_size(self) -> int:
+        return self.size
+
+    def __len__(self) -> int:
+        """
+        Returns the number of top-level keys in the table.
+        """
+        return self.count
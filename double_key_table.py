@@ -1,13 +1,21 @@
 from __future__ import annotations
 
-from typing import Generic, TypeVar, Iterator
+from ctypes import py_object, sizeof
+from typing import Generic, TypeVar, Iterable, Iterator
 from data_structures.hash_table import LinearProbeTable, FullError
 from data_structures.referential_array import ArrayR
+from data_structures.hashing import string_hash
+from algorithms.primes import next_table_size
 
 K1 = TypeVar('K1')
 K2 = TypeVar('K2')
 V = TypeVar('V')
 
+# Left in the old outer array in place of each entry moved out by an
+# incremental rehash. It compares unequal to every key, so probes of the
+# old array pass over it just like an entry for another key.
+MIGRATED = (object(), None)
+
 
 class DoubleKeyTable(Generic[K1, K2, V]):
     """
@@ -20,6 +28,26 @@ class DoubleKeyTable(Generic[K1, K2, V]):
                 Otherwise `hash2` should be overwritten.
         - V:    Value Type.
 
+    The outer table grows once more than max_load_factor of it holds top-level keys,
+    and shrinks once less than min_load_factor of it does (0 disables shrinking).
+    With extend_sizes, primes beyond the end of TABLE_SIZES (or internal_sizes, for
+    the inner tables) are generated when needed, otherwise tables stop growing.
+
+    Resizing moves each top-level key's inner table over by reference, without
+    rehashing its entries. With incremental_rehash, this is spread out: the old
+    outer array is kept alongside the new one, and every operation moves at most
+    MIGRATION_STEP of its slots, so no single operation pays for the whole table.
+    Keys are looked up in the new array, then the old one. This needs the default
+    hash1, since the old array is probed modulo its own size, so a table with
+    hash1 overwritten is resized all at once instead. Iterating finishes any
+    rehash in progress, so reading the table while iterating it yields each
+    key once.
+
+    With compact, a top-level key with a single bottom-level key holds the
+    pair inline, in an InlineTable, rather than in a LinearProbeTable of its
+    own. It is promoted to a real inner table when a second bottom-level key
+    arrives, and demoted again when deletes bring it back down to one.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
@@ -27,8 +55,39 @@ class DoubleKeyTable(Generic[K1, K2, V]):
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
     HASH_BASE = 31
+    HASH_SEED = 31417
+
+    MAX_LOAD_FACTOR = 0.5
+    MIN_LOAD_FACTOR = 0.125
+
+    # Old outer slots moved per operation during an incremental rehash.
+    MIGRATION_STEP = 4
+
+    def __init__(self, sizes: list | None = None, internal_sizes: list | None = None,
+                 max_load_factor: float | None = None, min_load_factor: float | None = None,
+                 extend_sizes: bool | None = None, value_typecode: str | None = None,
+                 incremental_rehash: bool = False, compact: bool = False) -> None:
+        """
+        Initialise the Hash Table.
+
+        By default TABLE_SIZES is only extended when neither sizes nor internal_sizes are given.
+        With value_typecode, the inner tables store values unboxed, see LinearProbeTable.
+        With compact, single pairs are stored inline, see the class docstring.
+
+        :raises ValueError: when the load factors are not 0 <= min < max < 1.
+        """
+        if extend_sizes is None:
+            extend_sizes = sizes is None and internal_sizes is None
+        self.extend_sizes = extend_sizes
+        self.value_typecode = value_typecode
+
+        if max_load_factor is not None:
+            self.MAX_LOAD_FACTOR = max_load_factor
+        if min_load_factor is not None:
+            self.MIN_LOAD_FACTOR = min_load_factor
+        if not 0 <= self.MIN_LOAD_FACTOR < self.MAX_LOAD_FACTOR < 1:
+            raise ValueError("Load factors must satisfy 0 <= min < max < 1")
 
-    def __init__(self, sizes: list | None = None, internal_sizes: list | None = None) -> None:
         if sizes is not None:
             self.TABLE_SIZES = sizes
 
@@ -41,44 +100,45 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         self.array: ArrayR[tuple[K1, V] | None] | None = ArrayR(self.TABLE_SIZES[self.size_index])
         self.count = 0
 
+        self.incremental_rehash = incremental_rehash
+        # The outer array being migrated away from, and the next slot of it to move.
+        self.old_array: ArrayR[tuple[K1, V] | None] | None = None
+        self.migrate_position = 0
+
+        self.compact = compact
+
     def hash1(self, key: K1) -> int:
         """
         Hash the 1st key for insert/retrieve/update into the hashtable.
 
-        :complexity: O(len(key))
+        :complexity: O(len(key)) the first time a key is hashed, O(1) afterwards.
         """
-
-        value = 0
-        a = 31417
-        for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
-        return value
+        return string_hash(key, self.HASH_SEED, self.HASH_BASE) % self.table_size
 
     def hash2(self, key: K2, sub_table: LinearProbeTable[K2, V]) -> int:
         """
         Hash the 2nd key for insert/retrieve/update into the hashtable.
 
-        :complexity: O(len(key))
+        :complexity: O(len(key)) the first time a key is hashed, O(1) afterwards.
         """
-
-        value = 0
-        a = 31417
-        for char in key:
-            value = (ord(char) + a * value) % sub_table.table_size
-            a = a * self.HASH_BASE % (sub_table.table_size - 1)
-        return value
+        return string_hash(key, self.HASH_SEED, self.HASH_BASE) % sub_table.table_size
 
     def _linear_probe(self, key1: K1, key2: K2 | None, is_insert: bool) -> tuple[int, int] | int:
         """
         Find the correct position for this key in the hash table using linear probing.
 
+        Positions are only meaningful in a single outer array, so any
+        incremental rehash in progress is finished first. An inline pair of a
+        compact table is found at position 0, and only promoted to a real
+        inner table for an insert.
+
         :Best case complexity: O(hash1(key1)) when key2 is None, and the first position is available.
         :Worst case complexity: O((hash1(key1) + N) * (hash2(key2) + M)) when for both positions, the whole
                                 table needs to be probed. N is the Outer table size, and M is the Inner table size.
         :raises KeyError: When the key pair is not in the table, but is_insert is False.
         :raises FullError: When a table is full and cannot be inserted.
         """
+        self._finish_migration()
         pos1 = self.hash1(key1)
         
         if key2 is None:
@@ -96,15 +156,22 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             for _ in range(self.table_size):
                 if self.array[pos1] is None:
                     if is_insert:
-                        self.array[pos1] = (key1, LinearProbeTable(self.internal_sizes))
+                        self.array[pos1] = (key1, self._new_sub_table())
                         sub_table = self.array[pos1][1]
-                        sub_table.hash = lambda k, tab = sub_table: self.hash2(k, tab)
                         pos2 = sub_table._linear_probe(key2, is_insert)
                         return (pos1, pos2)
                     else:
                         raise KeyError(key1)
                 elif self.array[pos1][0] == key1:
                     sub_table = self.array[pos1][1]
+                    if isinstance(sub_table, InlineTable):
+                        if not is_insert:
+                            # A lookup leaves the pair inline, in its one slot.
+                            if key2 not in sub_table:
+                                raise KeyError(key2)
+                            return (pos1, 0)
+                        # Positions to insert at are only meaningful in a real inner table.
+                        sub_table = self._promote(key1, sub_table)
                     pos2 = sub_table._linear_probe(key2, is_insert)
                     return (pos1, pos2)
                 else:
@@ -115,6 +182,60 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         else:
             raise KeyError(key1)
 
+    def _new_sub_table(self) -> SubTable[K2, V]:
+        """
+        Create an empty bottom-level table, hashing its keys with hash2.
+        """
+        return SubTable(self, self.internal_sizes, extend_sizes=self.extend_sizes,
+                        value_typecode=self.value_typecode)
+
+    def _new_entry(self) -> SubTable[K2, V] | InlineTable[K2, V]:
+        """
+        Create an empty entry for a new top-level key: inline when compact,
+        otherwise a bottom-level table.
+        """
+        if self.compact:
+            return InlineTable()
+        return self._new_sub_table()
+
+    def _promote(self, key1: K1, inline: InlineTable[K2, V]) -> SubTable[K2, V]:
+        """
+        Replace the inline entry of key1 with a bottom-level table holding its pair.
+
+        :complexity: See _locate.
+        """
+        sub_table = self._new_sub_table()
+        sub_table.update(inline.iter_items())
+        array, position = self._locate(key1)
+        array[position] = (key1, sub_table)
+        return sub_table
+
+    def _demote(self, array: ArrayR, position: int) -> None:
+        """
+        When compact, replace the bottom-level table at position of the given
+        outer array with an inline entry once it holds a single pair.
+
+        :complexity: O(M) when demoted, where M is the Inner table size.
+        """
+        key1, sub_table = array[position]
+        if self.compact and isinstance(sub_table, SubTable) and len(sub_table) == 1:
+            key2, value = next(sub_table.iter_items())
+            array[position] = (key1, InlineTable(key2, value))
+
+    def _default_hash2(self) -> bool:
+        """
+        Whether hash2 is still the default, i.e. it has not been overwritten
+        on this table or a subclass.
+        """
+        return "hash2" not in self.__dict__ and type(self).hash2 is DoubleKeyTable.hash2
+
+    def _default_hash1(self) -> bool:
+        """
+        Whether hash1 is still the default, i.e. it has not been overwritten
+        on this table or a subclass.
+        """
+        return "hash1" not in self.__dict__ and type(self).hash1 is DoubleKeyTable.hash1
+
     def iter_keys(self, key: K1 | None = None) -> Iterator[K1 | K2]:
         """
         key = None:
@@ -122,29 +243,16 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         key = k:
             Returns an iterator of all keys in the bottom-hash-table for k.
 
-        :Best case complexity: O(N) when key is None. N is the Outer table size.
-        :Worst case complexity: O(linear_probe(key) + N) when key is not None. N is the Outer table size.
+        The tables are walked as the iterator is consumed, so the first key is
+        available straight away and no list of keys is built.
+
+        :complexity: O(linear_probe(key)) to create when key is not None, O(1) otherwise.
+                     Each key then takes O(N) at worst, where N is the size of the table being walked.
+        :raises KeyError: when key is not None and not in the table.
         """
-        res = []
         if key is not None:
-            pos1 = self._linear_probe(key, None ,False)
-            sub_table = self.array[pos1][1]
-            for i in range(sub_table.table_size):
-                if sub_table.array[i] is not None:
-                    res.append(sub_table.array[i][0])   
-        else:
-            for i in range(self.table_size):
-                if self.array[i] is not None:
-                    res.append(self.array[i][0])
-
-        res.reverse()
-
-        def KeysGen():
-            for _ in res:
-                yield res
-            return
-
-        return KeysGen()
+            return self._sub_table(key).iter_keys()
+        return (key1 for key1, _ in self._iter_outer())
 
     def iter_values(self, key: K1 | None = None) -> Iterator[V]:
         """
@@ -153,32 +261,125 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         key = k:
             Returns an iterator of all values in the bottom-hash-table for k.
 
-        :Best case complexity: O(linear_probe(key) + N) when key is not None. N is the Outer table size.
-        :Worst case complexity: O(N * M) when key is None. N is the Outer table size,
-                                and M is the Inner table size.
+        :complexity: See iter_keys. With key = None, each value takes O(N + M) at worst,
+                     where N is the Outer table size, and M is the Inner table size.
+        :raises KeyError: when key is not None and not in the table.
         """
-        res = []
         if key is not None:
-            pos1 = self._linear_probe(key, None ,False)
-            sub_table = self.array[pos1][1]
-            for i in range(sub_table.table_size):
-                if sub_table.array[i] is not None:
-                    res.append(sub_table.array[i][1])    
-        else:
-            for i in range(self.table_size):
-                if self.array[i] is not None:
-                    for j in range(self.array[i][1].table_size):
-                        if self.array[i][1].array[j] is not None:
-                            res.append(self.array[i][1].array[j][1])
+            return self._sub_table(key).iter_values()
+        return (value for _, _, value in self.iter_items())
 
-        res.reverse()
+    def iter_items(self) -> Iterator[tuple[K1, K2, V]]:
+        """
+        Returns an iterator of all (key1, key2, value) triples in the hash table.
 
-        def ValuesGen():
-            for _ in res:
-                yield res
-            return
+        :complexity: See iter_values.
+        """
+        for key1, sub_table in self._iter_outer():
+            for key2, value in sub_table.iter_items():
+                yield (key1, key2, value)
+
+    def _iter_outer(self) -> Iterator[tuple[K1, SubTable[K2, V]]]:
+        """
+        Returns an iterator of all (key1, sub_table) entries of the outer table.
+
+        Any incremental rehash in progress is finished before the first
+        entry, as lookups made while iterating would otherwise move entries
+        from the old array into the new one, where they would be met again.
+
+        :complexity: O(N) at worst for each entry, where N is the Outer table size,
+                     plus the rest of an incremental rehash before the first.
+        """
+        self._finish_migration()
+        for item in self.array:
+            if item is not None:
+                yield item
+
+    def _sub_table(self, key1: K1) -> SubTable[K2, V]:
+        """
+        Returns the bottom-level table for key1.
+
+        :complexity: See _find_sub_table.
+        :raises KeyError: when key1 is not in the table.
+        """
+        sub_table = self._find_sub_table(key1)
+        if sub_table is None:
+            raise KeyError(key1)
+        return sub_table
+
+    def _find_sub_table(self, key1: K1) -> SubTable[K2, V] | None:
+        """
+        Returns the bottom-level table for key1, or None if key1 is not in the table.
+
+        This is the lookup half of _linear_probe, without the insert logic or
+        exceptions, for the hot lookup paths.
 
-        return ValuesGen()
+        :complexity best: O(hash1(key1)) first position holds key1 or is empty.
+        :complexity worst: O(hash1(key1) + N*comp(K1)) N is the Outer table size.
+        """
+        array, position = self._locate(key1)
+        if array is None:
+            return None
+        return array[position][1]
+
+    def _locate(self, key1: K1) -> tuple[ArrayR | None, int]:
+        """
+        Returns the outer array holding key1 and its position there, or
+        (None, -1) if key1 is not in the table. Only the new array is
+        searched unless an incremental rehash is in progress.
+
+        :complexity: See _find_sub_table.
+        """
+        position = self._find_position(self.array, key1, self.hash1(key1))
+        if position >= 0:
+            return self.array, position
+        if self.old_array is not None:
+            old_array = self.old_array
+            home = string_hash(key1, self.HASH_SEED, self.HASH_BASE) % len(old_array)
+            position = self._find_position(old_array, key1, home)
+            if position >= 0:
+                return old_array, position
+        return None, -1
+
+    def _find_position(self, array: ArrayR, key1: K1, position: int) -> int:
+        """
+        Linear probe an outer array for key1 from its home position,
+        returning where it is, or -1 if it is not there.
+
+        :complexity: See _find_sub_table.
+        """
+        size = len(array)
+        for _ in range(size):
+            item = array[position]
+            if item is None:
+                return -1
+            if item[0] == key1:
+                return position
+            position += 1
+            if position == size:
+                position = 0
+        return -1
+
+    def _place(self, key1: K1, sub_table: SubTable[K2, V]) -> None:
+        """
+        Put an entry for key1, which must not already be in the table, into
+        the first empty slot of the outer array from its home position.
+
+        :complexity best: O(hash1(key1)) first position is empty.
+        :complexity worst: O(hash1(key1) + N) N is the Outer table size.
+        :raises FullError: when the outer array is full.
+        """
+        array = self.array
+        size = len(array)
+        position = self.hash1(key1)
+        for _ in range(size):
+            if array[position] is None:
+                array[position] = (key1, sub_table)
+                return
+            position += 1
+            if position == size:
+                position = 0
+        raise FullError("Outer Table is Full")
 
     def keys(self, key: K1 | None = None) -> list[K1 | K2]:
         """
@@ -187,12 +388,7 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :complexity: See iter_keys.
         """
-        if key is not None:
-            keyIter = self.iter_keys(key) 
-        else:
-            keyIter = self.iter_keys()
-
-        return next(keyIter)
+        return list(self.iter_keys(key))
 
     def values(self, key: K1 | None = None) -> list[V]:
         """
@@ -201,105 +397,372 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :complexity: See iter_values.
         """
-        res = []
-        if key is not None:
-            valueIter = self.iter_values(key)
-            res = next(valueIter)
-
-        else:
-            valueIter = self.iter_values()
-            res = next(valueIter)
-
-        return res 
+        return list(self.iter_values(key))
 
     def __contains__(self, key: tuple[K1, K2]) -> bool:
         """
         Checks to see if the given key is in the Hash Table
 
-        :complexity: See linear probe.
+        :complexity: See _find_sub_table and LinearProbeTable.__contains__.
         """
-        try:
-            _ = self[key]
-        except KeyError:
-            return False
-        else:
-            return True
+        key1, key2 = key
+        if self.old_array is not None:
+            self._migrate(self.MIGRATION_STEP)
+        sub_table = self._find_sub_table(key1)
+        return sub_table is not None and key2 in sub_table
 
     def __getitem__(self, key: tuple[K1, K2]) -> V:
         """
         Get the value at a certain key
 
+        :complexity: See _find_sub_table and LinearProbeTable.__getitem__.
         :raises KeyError: when the key doesn't exist.
         """
-
-        position1, position2 = self._linear_probe(key[0], key[1], False)
-        return self.array[position1][1].array[position2][1]
+        key1, key2 = key
+        if self.old_array is not None:
+            self._migrate(self.MIGRATION_STEP)
+        return self._sub_table(key1)[key2]
 
     def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
         """
         Set an (key, value) pair in our hash table.
+
+        :complexity: See linear probe.
         """
 
         key1, key2 = key
-        position1, position2 = self._linear_probe(key1, key2, True)
-        sub_table = self.array[position1][1]
+        if self.old_array is not None:
+            self._migrate(self.MIGRATION_STEP)
+        sub_table = self._find_sub_table(key1)
+        if sub_table is None:
+            sub_table = self._new_entry()
+            self._place(key1, sub_table)
 
         if sub_table.is_empty():
             self.count += 1
+        if isinstance(sub_table, InlineTable) and not sub_table.fits([key2]):
+            sub_table = self._promote(key1, sub_table)
 
         sub_table[key2] = data
 
         # resize if necessary
-        if len(self) > self.table_size / 2:
+        if len(self) > self.table_size * self.MAX_LOAD_FACTOR:
             self._rehash()
 
     def __delitem__(self, key: tuple[K1, K2]) -> None:
         """
         Deletes a (key, value) pair in our hash table.
 
-        :complexity: O(linear_probe(key1, key2) + M) where M is the Inner table size.
+        The inner table deletes key2 itself, keeping its probe chains intact,
+        and its count says whether it is now empty.
+
+        :complexity: See _locate and LinearProbeTable.__delitem__.
         :raises KeyError: when the key doesn't exist.
         """
-        pos1, pos2 = self._linear_probe(key[0],key[1], False)
-        
-        self.array[pos1][1].array[pos2] = None
+        key1, key2 = key
+        if self.old_array is not None:
+            self._migrate(self.MIGRATION_STEP)
+        array, position = self._locate(key1)
+        if array is None:
+            raise KeyError(key1)
+        sub_table = array[position][1]
+        del sub_table[key2]
+
+        if sub_table.is_empty():
+            self._remove_outer(array, position)
+            if self.count < self.table_size * self.MIN_LOAD_FACTOR:
+                self._shrink()
+        else:
+            self._demote(array, position)
+
+    def _remove_outer(self, array: ArrayR, position: int) -> None:
+        """
+        Remove the top-level key at position of the given outer array.
+
+        Slots of the old array are left marked, so its probe chains stay
+        intact. In the current array, the rest of the cluster is reinserted,
+        so no key after the emptied slot is cut off from its home position.
+
+        :complexity: O(1) in the old array, O(C*place) in the current one,
+                     where C is the length of the cluster after position.
+        """
         self.count -= 1
+        if array is not self.array:
+            array[position] = MIGRATED
+            return
+        array[position] = None
+        size = len(array)
+        position = (position + 1) % size
+        while array[position] is not None:
+            item = array[position]
+            array[position] = None
+            self._place(item[0], item[1])
+            position = (position + 1) % size
+
+    @staticmethod
+    def _group(pairs: Iterable[tuple[tuple[K1, K2], V]]) -> dict[K1, list[tuple[K2, V]]]:
+        """
+        Group ((key1, key2), item) pairs by key1, as (key2, item) lists in
+        the order they were given.
 
-        empty = True
-        for i in range(self.array[pos1][1].table_size):
-            if self.array[pos1][1].array[i] != None:
-                empty = False
-        
-        if empty:
-            self.array[pos1] = None
+        :complexity: O(M*hash(K1)) where M is len(pairs).
+        """
+        groups = {}
+        for (key1, key2), item in pairs:
+            if key1 in groups:
+                groups[key1].append((key2, item))
+            else:
+                groups[key1] = [(key2, item)]
+        return groups
+
+    def _start_batch(self, groups: int) -> None:
+        """
+        Advance any incremental rehash in progress by as much as the given
+        number of single operations would have.
+
+        :complexity: O(groups * MIGRATION_STEP * place)
+        """
+        if self.old_array is not None:
+            self._migrate(self.MIGRATION_STEP * groups)
+
+    def set_many(self, items: Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        Set every ((key1, key2), value) pair in items.
+
+        The pairs are grouped by key1, so each top-level key is probed once.
+        The outer table is grown once, to the first size that can hold every
+        new top-level key, and each inner table is grown once for its group,
+        see LinearProbeTable.update. The load factors are not checked again
+        until all of the pairs are in.
+
+        :complexity: O(R + G*linear_probe(key1) + M*linear_probe(key2)) where R is the
+                     cost of one _rebuild, G is the number of distinct key1s and M is len(items).
+        :raises FullError: when a table cannot be resized far enough.
+        """
+        groups = self._group(items)
+        self._start_batch(len(groups))
+
+        sub_tables = [(self._find_sub_table(key1), key1, group) for key1, group in groups.items()]
+        new_keys = sum(1 for sub_table, _, _ in sub_tables if sub_table is None)
+        size_index = self.size_index
+        new_size = self.table_size
+        while self.count + new_keys > new_size * self.MAX_LOAD_FACTOR:
+            next_size = self._size_at(size_index + 1)
+            if next_size is None:
+                break
+            size_index += 1
+            new_size = next_size
+        if size_index != self.size_index:
+            self.size_index = size_index
+            self._rebuild(new_size)
+
+        for sub_table, key1, group in sub_tables:
+            if sub_table is None:
+                sub_table = self._new_entry()
+                self._place(key1, sub_table)
+            if sub_table.is_empty():
+                self.count += 1
+            if isinstance(sub_table, InlineTable) and not sub_table.fits(key2 for key2, _ in group):
+                sub_table = self._promote(key1, sub_table)
+            sub_table.update(group)
+
+        if len(self) > self.table_size * self.MAX_LOAD_FACTOR:
+            self._rehash()
+
+    def get_many(self, keys: Iterable[tuple[K1, K2]]) -> list[V]:
+        """
+        Get the value of every (key1, key2) pair in keys, in the same order.
+
+        The pairs are grouped by key1, so each top-level key is probed once.
+
+        :complexity: O(G*linear_probe(key1) + M*linear_probe(key2)) where G is the
+                     number of distinct key1s and M is len(keys).
+        :raises KeyError: when a key doesn't exist.
+        """
+        groups = self._group((key, index) for index, key in enumerate(keys))
+        self._start_batch(len(groups))
+
+        result = [None] * sum(len(group) for group in groups.values())
+        for key1, group in groups.items():
+            sub_table = self._sub_table(key1)
+            for key2, index in group:
+                result[index] = sub_table[key2]
+        return result
+
+    def delete_many(self, keys: Iterable[tuple[K1, K2]]) -> None:
+        """
+        Delete every (key1, key2) pair in keys.
+
+        The pairs are grouped by key1, so each top-level key is probed once,
+        and each inner table deletes its group in one go, see
+        LinearProbeTable.delete_many. The outer load factor is only checked
+        once all of the pairs are gone.
+
+        :complexity: O(R + G*linear_probe(key1) + M*linear_probe(key2)) where R is the
+                     cost of one _rebuild, G is the number of distinct key1s and M is len(keys).
+        :raises KeyError: when a key doesn't exist. Groups before its own are deleted,
+                          as are the pairs of its own group before it.
+        """
+        groups = self._group((key, None) for key in keys)
+        self._start_batch(len(groups))
+
+        for key1, group in groups.items():
+            array, position = self._locate(key1)
+            if array is None:
+                raise KeyError(key1)
+            sub_table = array[position][1]
+            try:
+                sub_table.delete_many(key2 for key2, _ in group)
+            finally:
+                # Also when a key2 was missing, as the pairs before it are gone.
+                if sub_table.is_empty():
+                    self._remove_outer(array, position)
+                else:
+                    self._demote(array, position)
+
+        while self.size_index > 0 and self.count < self.table_size * self.MIN_LOAD_FACTOR:
+            size_index = self.size_index
+            self._shrink()
+            if self.size_index == size_index:
+                break
 
     def _rehash(self) -> None:
         """
         Need to resize table and reinsert all values
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
-        Where N is len(self)
+        :complexity: See _rebuild.
         """
-        old_arr = self.array
+        new_size = self._size_at(self.size_index + 1)
+        if new_size is None:
+            # Cannot be resized further.
+            return
         self.size_index += 1
-        if self.size_index >= len(self.TABLE_SIZES):
+        self._rebuild(new_size)
+
+    def _shrink(self) -> None:
+        """
+        Move down to the previous table size, if the top-level keys fit in it
+        without going over max_load_factor.
+
+        :complexity: See _rebuild.
+        """
+        if self.size_index == 0:
             return
-        
-        self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
+        new_size = self.TABLE_SIZES[self.size_index - 1]
+        if self.count + 1 > new_size * self.MAX_LOAD_FACTOR:
+            return
+        self.size_index -= 1
+        self._rebuild(new_size)
 
-        for x in old_arr:
-            if x is not None:
-                key1, value1 = x
-                pos1 = self.hash1(key1)
-                self.array[pos1] = (key1, LinearProbeTable(self.TABLE_SIZES))
-                sub_table = self.array[pos1][1]
-                sub_table.hash = lambda k, tab = sub_table: self.hash2(k, tab)
-                for y in value1.array:
-                    if y is not None:
-                        key2, value2 = y
-                        self[key1, key2] = value2
+    def _rebuild(self, new_size: int) -> None:
+        """
+        Move every top-level key into a fresh outer table of new_size, taking
+        its inner table along by reference. With incremental_rehash, only the
+        new array is created here, and the keys are moved by later operations.
+
+        :complexity best: O(N*hash1(K1)) No probing, or O(new_size) when incremental.
+        :complexity worst: O(N*hash1(K1) + N^2) Lots of probing.
+        Where N is the Outer table size.
+        """
+        self._finish_migration()
+        old_arr = self.array
+        self.array = ArrayR(new_size)
+        if self.incremental_rehash and self._default_hash1():
+            self.old_array = old_arr
+            self.migrate_position = 0
+            return
+
+        for item in old_arr:
+            self._move(item)
+
+    def _move(self, item: tuple[K1, SubTable[K2, V]] | None) -> None:
+        """
+        Place an entry of an old outer array into the current one. Empty
+        inner tables, which were never counted, are dropped.
+
+        :complexity: See _place.
+        """
+        if item is not None and item is not MIGRATED and not item[1].is_empty():
+            self._place(item[0], item[1])
+
+    def _migrate(self, steps: int) -> None:
+        """
+        Move up to steps slots of the old outer array into the current one,
+        dropping the old array once every slot has been moved.
+
+        :complexity: O(steps * place)
+        """
+        old_array = self.old_array
+        end = min(self.migrate_position + steps, len(old_array))
+        for position in range(self.migrate_position, end):
+            item = old_array[position]
+            if item is not None:
+                self._move(item)
+                old_array[position] = MIGRATED
+        self.migrate_position = end
+        if end == len(old_array):
+            self.old_array = None
+
+    def _finish_migration(self) -> None:
+        """
+        Complete any incremental rehash in progress.
+
+        :complexity: O(N * place) where N is the old outer table size.
+        """
+        if self.old_array is not None:
+            self._migrate(len(self.old_array))
+
+    def _size_at(self, index: int) -> int | None:
+        """
+        Returns TABLE_SIZES[index], extending TABLE_SIZES with further primes
+        if needed and allowed, or None if the table cannot grow that far.
+
+        :complexity: O(1) unless a new prime is generated, see next_table_size.
+        """
+        if index >= len(self.TABLE_SIZES) and self.extend_sizes:
+            # Extend a copy, so the class's list is left alone.
+            self.TABLE_SIZES = self.TABLE_SIZES + [next_table_size(self.TABLE_SIZES[-1])]
+        if index < len(self.TABLE_SIZES):
+            return self.TABLE_SIZES[index]
+        return None
+
+    def memory_usage(self) -> dict:
+        """
+        Reports the bytes taken by the slots of the tables, not counting the
+        keys and values they refer to.
+
+        :returns: A dictionary with:
+            - outer, the bytes of the outer array, and of the old one during an incremental rehash.
+            - inner and inner_tables, the bytes and number of the bottom-level tables.
+            - inline and inline_entries, the bytes and number of the inline entries.
+            - total, the sum of outer, inner and inline.
+        The outer arrays are walked as they are, so an incremental rehash in
+        progress is left alone.
+        :complexity: O(N) where N is the Outer table size.
+        """
+        outer = inner = inner_tables = inline = inline_entries = 0
+        for array in (self.array, self.old_array):
+            if array is None:
+                continue
+            outer += array.memory_usage()
+            for item in array:
+                if item is None or item is MIGRATED:
+                    continue
+                sub_table = item[1]
+                if isinstance(sub_table, InlineTable):
+                    inline += sub_table.memory_usage()
+                    inline_entries += 1
+                else:
+                    inner += sub_table.memory_usage()
+                    inner_tables += 1
+        return {
+            "outer": outer,
+            "inner": inner,
+            "inner_tables": inner_tables,
+            "inline": inline,
+            "inline_entries": inline_entries,
+            "total": outer + inner + inline,
+        }
 
     @property
     def table_size(self) -> int:
@@ -322,13 +785,136 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         :complexity: O(N * M) where N is the Outer table sizes and M is the Inner table sizes
         """
         result = ""
-        for item in self.array:
-            if item is not None:
-                (key, value) = item
-                result += "(" + str(key) + ": [" 
-                for item2 in value.array:
-                    if item2 is not None:
-                        (key2, value2) = item2
-                        result += "(" + str(key2) + ", " + str(value2) + ")"
-                result += "]\n"
-        return result
\ No newline at end of file
+        for (key, value) in self._iter_outer():
+            result += "(" + str(key) + ": [" 
+            for key2, value2 in zip(value.keys(), value.values()):
+                result += "(" + str(key2) + ", " + str(value2) + ")"
+            result += "]\n"
+        return result
+
+
+class SubTable(LinearProbeTable[K2, V]):
+    """
+    Bottom-level table of a DoubleKeyTable, hashing its keys with the owner's hash2.
+
+    Every bottom-level table shares its owner's hash seed, so while hash2
+    has not been overwritten, the cached full hashes reduced modulo the
+    table size are exactly hash2, and the owner does not need to be called.
+    """
+
+    def __init__(self, owner: DoubleKeyTable[K1, K2, V], sizes=None, **kwargs) -> None:
+        self.owner = owner
+        self.HASH_SEED = owner.HASH_SEED
+        self.HASH_BASE = owner.HASH_BASE
+        super().__init__(sizes, **kwargs)
+
+    def hash(self, key: K2) -> int:
+        """
+        Hash a key with the owner's hash2.
+
+        :complexity: See DoubleKeyTable.hash2.
+        """
+        return self.owner.hash2(key, self)
+
+    def _default_hash(self) -> bool:
+        return self.owner._default_hash2()
+
+# Stands in for the key of an empty InlineTable, equal to no other key.
+NO_KEY = object()
+
+
+class InlineTable(Generic[K2, V]):
+    """
+    Holds the single (key2, value) pair of a top-level key of a compact
+    DoubleKeyTable, offering the parts of LinearProbeTable the outer table uses.
+
+    All methods have O(1) complexity.
+    """
+
+    __slots__ = ("key", "value")
+
+    def __init__(self, key: K2 = NO_KEY, value: V | None = None) -> None:
+        self.key = key
+        self.value = value
+
+    def fits(self, keys: Iterable[K2]) -> bool:
+        """
+        Whether setting every key in keys would still leave a single pair.
+        """
+        held = self.key
+        for key in keys:
+            if held is NO_KEY:
+                held = key
+            elif key != held:
+                return False
+        return True
+
+    def iter_items(self) -> Iterator[tuple[K2, V]]:
+        if self.key is not NO_KEY:
+            yield (self.key, self.value)
+
+    def iter_keys(self) -> Iterator[K2]:
+        return (key for key, _ in self.iter_items())
+
+    def iter_values(self) -> Iterator[V]:
+        return (value for _, value in self.iter_items())
+
+    def keys(self) -> list[K2]:
+        return list(self.iter_keys())
+
+    def values(self) -> list[V]:
+        return list(self.iter_values())
+
+    def __contains__(self, key: K2) -> bool:
+        return self.key is not NO_KEY and self.key == key
+
+    def __getitem__(self, key: K2) -> V:
+        """
+        :raises KeyError: when the key doesn't exist.
+        """
+        if key not in self:
+            raise KeyError(key)
+        return self.value
+
+    def __setitem__(self, key: K2, data: V) -> None:
+        """
+        :pre: fits([key])
+        """
+        self.key = key
+        self.value = data
+
+    def update(self, items: Iterable[tuple[K2, V]]) -> None:
+        """
+        :pre: fits the keys of items.
+        """
+        for key, data in items:
+            self[key] = data
+
+    def __delitem__(self, key: K2) -> None:
+        """
+        :raises KeyError: when the key doesn't exist.
+        """
+        if key not in self:
+            raise KeyError(key)
+        self.key = NO_KEY
+        self.value = None
+
+    def delete_many(self, keys: Iterable[K2]) -> None:
+        """
+        :raises KeyError: when a key doesn't exist.
+        """
+        for key in keys:
+            del self[key]
+
+    def __len__(self) -> int:
+        return 0 if self.key is NO_KEY else 1
+
+    def is_empty(self) -> bool:
+        return self.key is NO_KEY
+
+    def memory_usage(self) -> int:
+        """
+        Returns the number of bytes taken by the key and value slots, like
+        LinearProbeTable.memory_usage, not the objects they refer to.
+        """
+        return 2 * sizeof(py_object)
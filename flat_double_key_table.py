@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from typing import Generic, TypeVar, Iterator
+from data_structures.hash_table import LinearProbeTable
+from data_structures.hashing import string_hash, MASK_64
+
+K1 = TypeVar('K1')
+K2 = TypeVar('K2')
+V = TypeVar('V')
+
+
+class PairTable(LinearProbeTable[tuple[K1, K2], V]):
+    """
+    Linear Probe Table keyed by (key1, key2) pairs.
+
+    The full hash of a pair combines the cached hashes of its two keys,
+    so each key is only hashed character by character once.
+    """
+
+    # Multiplier mixing the hash of key1 into the hash of the pair.
+    PAIR_MULTIPLIER = 1000003
+
+    def full_hash(self, key: tuple[K1, K2]) -> int:
+        """
+        Hash a (key1, key2) pair independently of the table size.
+
+        :complexity: O(len(key1) + len(key2)) the first time the keys are hashed, O(1) afterwards.
+        """
+        key1, key2 = key
+        hash1 = string_hash(key1, self.HASH_SEED, self.HASH_BASE)
+        hash2 = string_hash(key2, self.HASH_SEED, self.HASH_BASE)
+        return ((hash1 * self.PAIR_MULTIPLIER) ^ hash2) & MASK_64
+
+
+class FlatDoubleKeyTable(Generic[K1, K2, V]):
+    """
+    Double Key Table storing every pair in one flat table.
+
+    An alternative to DoubleKeyTable for workloads dominated by lookups of
+    single (key1, key2) pairs: each access hashes and probes once, and there
+    is no LinearProbeTable per top-level key.
+
+    Enumerating the bottom-level keys of a top-level key needs an index from
+    each key1 to its key2s. It is only built the first time keys(key1) or
+    values(key1) is called, and kept up to date from then on.
+
+    Inserting a new pair costs more than a lookup: besides the flat table,
+    key1_counts is probed to count the key1's pairs, and so is the index once
+    built. Deleting a pair does the same. Updating an existing pair only
+    touches the flat table.
+
+    Type Arguments:
+        - K1:   1st Key Type. Should be string.
+        - K2:   2nd Key Type. Should be string.
+        - V:    Value Type.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    def __init__(self, sizes: list | None = None, internal_sizes: list | None = None, **kwargs) -> None:
+        """
+        Initialise the Hash Table. There are no inner tables, so internal_sizes
+        is accepted for DoubleKeyTable's signature and ignored. Any other
+        arguments are passed on to the flat LinearProbeTable, see its
+        constructor, so DoubleKeyTable's incremental_rehash and compact are not
+        accepted.
+        """
+        self.pairs: PairTable[K1, K2, V] = PairTable(sizes, **kwargs)
+        # Number of bottom-level keys of each top-level key.
+        self.key1_counts: LinearProbeTable[K1, int] = LinearProbeTable()
+        self.index: LinearProbeTable[K1, list[K2]] | None = None
+
+    def _key2_index(self) -> LinearProbeTable[K1, list[K2]]:
+        """
+        Returns the index from each key1 to its key2s, building it if needed.
+
+        :complexity: O(N) the first time, where N is the flat table size, O(1) afterwards.
+        """
+        if self.index is None:
+            self.index = LinearProbeTable()
+            for key1, key2 in self.pairs.iter_keys():
+                if key1 in self.index:
+                    self.index[key1].append(key2)
+                else:
+                    self.index[key1] = [key2]
+        return self.index
+
+    def iter_keys(self, key: K1 | None = None) -> Iterator[K1 | K2]:
+        """
+        key = None:
+            Returns an iterator of all top-level keys in hash table
+        key = k:
+            Returns an iterator of all keys in the bottom-hash-table for k.
+
+        :complexity: See _key2_index when key is not None.
+        :raises KeyError: when key is not None and not in the table.
+        """
+        if key is not None:
+            return iter(self._key2_index()[key])
+        return self.key1_counts.iter_keys()
+
+    def iter_values(self, key: K1 | None = None) -> Iterator[V]:
+        """
+        key = None:
+            Returns an iterator of all values in hash table
+        key = k:
+            Returns an iterator of all values in the bottom-hash-table for k.
+
+        :complexity: See _key2_index when key is not None.
+        :raises KeyError: when key is not None and not in the table.
+        """
+        if key is not None:
+            return (self.pairs[key, key2] for key2 in self._key2_index()[key])
+        return self.pairs.iter_values()
+
+    def iter_items(self) -> Iterator[tuple[K1, K2, V]]:
+        """
+        Returns an iterator of all (key1, key2, value) triples in the hash table.
+
+        :complexity: O(N) at worst for each triple, where N is the flat table size.
+        """
+        return ((key1, key2, value) for (key1, key2), value in self.pairs.iter_items())
+
+    def keys(self, key: K1 | None = None) -> list[K1 | K2]:
+        """
+        key = None: returns all top-level keys in the table.
+        key = x: returns all bottom-level keys for top-level key x.
+
+        :complexity: See iter_keys.
+        """
+        return list(self.iter_keys(key))
+
+    def values(self, key: K1 | None = None) -> list[V]:
+        """
+        key = None: returns all values in the table.
+        key = x: returns all values for top-level key x.
+
+        :complexity: See iter_values.
+        """
+        return list(self.iter_values(key))
+
+    def __contains__(self, key: tuple[K1, K2]) -> bool:
+        """
+        Checks to see if the given key is in the Hash Table
+
+        :complexity: See LinearProbeTable.__contains__.
+        """
+        return key in self.pairs
+
+    def __getitem__(self, key: tuple[K1, K2]) -> V:
+        """
+        Get the value at a certain key
+
+        :complexity: See LinearProbeTable.__getitem__.
+        :raises KeyError: when the key doesn't exist.
+        """
+        return self.pairs[key]
+
+    def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
+        """
+        Set an (key, value) pair in our hash table.
+
+        Only a new pair touches key1_counts and the index.
+
+        :complexity: See LinearProbeTable.__setitem__.
+        """
+        key = tuple(key)
+        before = len(self.pairs)
+        self.pairs[key] = data
+        if len(self.pairs) == before:
+            return
+
+        key1, key2 = key
+        if key1 in self.key1_counts:
+            self.key1_counts[key1] += 1
+        else:
+            self.key1_counts[key1] = 1
+        if self.index is not None:
+            if key1 in self.index:
+                self.index[key1].append(key2)
+            else:
+                self.index[key1] = [key2]
+
+    def __delitem__(self, key: tuple[K1, K2]) -> None:
+        """
+        Deletes a (key, value) pair in our hash table.
+
+        :complexity: See LinearProbeTable.__delitem__, plus O(K) to update the
+                     index if it has been built, where K is the number of key2s for key1.
+        :raises KeyError: when the key doesn't exist.
+        """
+        key = tuple(key)
+        del self.pairs[key]
+
+        key1, key2 = key
+        remaining = self.key1_counts[key1] - 1
+        if remaining == 0:
+            del self.key1_counts[key1]
+        else:
+            self.key1_counts[key1] = remaining
+        if self.index is not None:
+            if remaining == 0:
+                del self.index[key1]
+            else:
+                self.index[key1].remove(key2)
+
+    @property
+    def table_size(self) -> int:
+        """
+        Return the current size of the flat table (different from the length)
+        """
+        return self.pairs.table_size
+
+    def __len__(self) -> int:
+        """
+        Returns number of top-level keys in the hash table, like DoubleKeyTable.
+        """
+        return len(self.key1_counts)
+
+    def __str__(self) -> str:
+        """
+        String representation.
+
+        :complexity: O(N) where N is the flat table size.
+        """
+        result = ""
+        for key1, key2, value in self.iter_items():
+            result += "(" + str(key1) + ", " + str(key2) + ", " + str(value) + ")\n"
+        return result
@@ -1,7 +1,7 @@
 from __future__ import annotations
-from typing import Generic, TypeVar
-from algorithms.mergesort import *
-from data_structures.referential_array import ArrayR
+from itertools import groupby, islice
+from typing import Generic, Iterator, TypeVar
+from data_structures.referential_array import ArrayR, SparseArrayR
 
 K = TypeVar("K")
 V = TypeVar("V")
@@ -16,80 +16,192 @@ class InfiniteHashTable(Generic[K, V]):
                 Otherwise `hash` should be overwritten.
         - V:    Value Type.
 
+    Each slot holds either a (key, value) pair, or (character, sub-table)
+    for the keys sharing that position, one level further down. Every table
+    counts the keys below it, and a sub-table is only kept while it holds at
+    least two keys. Different characters can share a position, so a
+    sub-table is marked mixed once a key below it has a character other
+    than the one in its slot. The mark stays until the sub-table goes.
+
+    Most sub-tables only hold a few keys, so by default the slots are kept
+    in a SparseArrayR, which only allocates all TABLE_SIZE of them once more
+    than a handful are taken. ARRAY_TYPE can be set to ArrayR to always
+    allocate them.
+
+    All operations walk down the levels in a loop rather than recursing,
+    so keys with long shared prefixes need no deep call stacks.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
     TABLE_SIZE = 27
+    ARRAY_TYPE = SparseArrayR
+
+    # There is one of these for every sub-table, so no __dict__ each.
+    __slots__ = ("array", "count", "level", "mixed")
 
     def __init__(self, level: int = 0) -> None:
-        self.array: ArrayR[tuple[K, V] | None] = ArrayR(self.TABLE_SIZE)
-        self.keys = []
+        self.array: ArrayR[tuple[K, V] | None] | SparseArrayR[tuple[K, V] | None] = self.ARRAY_TYPE(self.TABLE_SIZE)
         self.count = 0
         self.level = level
+        self.mixed = False
     
     def hash(self, key: K) -> int:
-        if self.level < len(key):
-            return ord(key[self.level]) % (self.TABLE_SIZE-1)
+        return self.hash_at(key, self.level)
+
+    def hash_at(self, key: K, level: int) -> int:
+        """
+        The position of key in a table at the given level.
+        """
+        if level < len(key):
+            return ord(key[level]) % (self.TABLE_SIZE-1)
         return self.TABLE_SIZE-1
 
-    def __getitem__(self, key: K) -> V:
+    def _find(self, key: K) -> tuple[InfiniteHashTable[K, V], int]:
         """
-        Get the value at a certain key
+        Returns the table and position holding the (key, value) pair for key.
 
         :complexity: O(hash(key) * level) where the level indicates what level of hash table the item is in.
         :raises KeyError: when the key doesn't exist.
         """
-        pos = self.hash(pos)
-
-        if self.array[pos] is None:
-            raise KeyError(key)
-        else:
-            if self.array[pos][0] == key:
-                return self.array[pos][1]
+        table = self
+        while True:
+            pos = table.hash(key)
+            entry = table.array[pos]
+            if entry is None:
+                raise KeyError(key)
+            if isinstance(entry[1], InfiniteHashTable):
+                table = entry[1]
+            elif entry[0] == key:
+                return table, pos
             else:
-                sub_table = self.array[pos][1]
-                return sub_table[key]
+                raise KeyError(key)
+
+    def __getitem__(self, key: K) -> V:
+        """
+        Get the value at a certain key
+
+        :complexity: See _find.
+        :raises KeyError: when the key doesn't exist.
+        """
+        table, pos = self._find(key)
+        return table.array[pos][1]
 
     def __setitem__(self, key: K, value: V) -> None:
         """
         Set an (key, value) pair in our hash table.
 
+        When the position is taken by another key, a sub-table is added one
+        level down and that key moved into it, until the two keys part ways.
+
         :Best case complexity: O(hash(key)) when position is empty.
         :Worst case complexity: O(hash(key1) * hash(key2)) where key1 and key2 are two colliding items.
+        :raises ValueError: when key cannot be told apart from a key in the table by hash.
         """
-        pos = self.hash(key)
-        self.keys.append(key)
-        self.count += 1
+        path = []
+        table = self
+        while True:
+            path.append(table)
+            pos = table.hash(key)
+            entry = table.array[pos]
+            if entry is None:
+                table.array[pos] = (key, value)
+                break
+            if isinstance(entry[1], InfiniteHashTable):
+                if key[table.level] != entry[0]:
+                    entry[1].mixed = True
+                table = entry[1]
+                continue
 
-        if self.array[pos] is None:
-            self.array[pos] = (key,value)
-            
-        else:
-            old_key, old_value  = self.array[pos]
-            new_level = self.level + 1
-            self.array[pos] = (key[self.level], InfiniteHashTable(new_level))
-            sub_table = self.array[pos][1]
-            sub_table[old_key] = old_value
-            sub_table[key] = value          
+            old_key = entry[0]
+            if old_key == key:
+                # Update, the count is unchanged.
+                table.array[pos] = (key, value)
+                return
+            sub_table = self._split(table.level, entry, (key, value))
+            table.array[pos] = (key[table.level], sub_table)
+            break
+
+        for table in path:
+            table.count += 1
+
+    def _split(self, level: int, entry: tuple[K, V], new_entry: tuple[K, V]) -> InfiniteHashTable[K, V]:
+        """
+        Returns a new sub-table one below the given level, where the keys of
+        the two pairs share a position, holding both pairs. Further levels are
+        added below it while the keys keep sharing a position, and nothing is
+        linked into the table until they part ways.
+
+        :complexity: O(D * (TABLE_SIZE + hash(key))) where D is the number of levels added.
+        :raises ValueError: when the two keys cannot be told apart by hash.
+        """
+        key, new_key = entry[0], new_entry[0]
+        if level >= len(key) and level >= len(new_key):
+            raise ValueError("Keys " + str(key) + " and " + str(new_key) + " have the same hashes")
+        top = table = type(self)(level + 1)
+        top.mixed = key[level] != new_key[level]
+        while table.hash(key) == table.hash(new_key):
+            if table.level >= len(key) and table.level >= len(new_key):
+                raise ValueError("Keys " + str(key) + " and " + str(new_key) + " have the same hashes")
+            sub_table = type(self)(table.level + 1)
+            sub_table.mixed = key[table.level] != new_key[table.level]
+            table.array[table.hash(new_key)] = (new_key[table.level], sub_table)
+            table.count = 2
+            table = sub_table
+        table.array[table.hash(key)] = entry
+        table.array[table.hash(new_key)] = new_entry
+        table.count = 2
+        return top
 
     def __delitem__(self, key: K) -> None:
         """
         Deletes a (key, value) pair in our hash table.
+
+        A sub-table left holding a single key is replaced by that key's pair.
         
         :complexity: O(hash(key) * level) where the level indicates what level of hash table the item is in.
         :raises KeyError: when the key doesn't exist.
         """
-        pos = self.hash(key)
-
-        if self.array[pos] is None:
-            raise KeyError(key)
-        else:
-            if self.array[pos][0] == key or type(self.array[pos][1]) is int:
-                self.array[pos] = None
-                self.count -= 1
+        path = []
+        table = self
+        while True:
+            pos = table.hash(key)
+            path.append((table, pos))
+            entry = table.array[pos]
+            if entry is None:
+                raise KeyError(key)
+            if isinstance(entry[1], InfiniteHashTable):
+                table = entry[1]
+            elif entry[0] == key:
+                break
             else:
-                sub_table = self.array[pos][1]
-                del sub_table[key]
+                raise KeyError(key)
+
+        table.array[pos] = None
+        for table, _ in path:
+            table.count -= 1
+
+        # Collapse the highest sub-table left with a single key.
+        for parent, pos in path:
+            sub_table = parent.array[pos][1] if parent.array[pos] is not None else None
+            if isinstance(sub_table, InfiniteHashTable) and sub_table.count == 1:
+                parent.array[pos] = sub_table._only_entry()
+                break
+
+    def _only_entry(self) -> tuple[K, V]:
+        """
+        Returns the (key, value) pair of a table holding a single key.
+
+        :complexity: O(TABLE_SIZE * D) where D is the number of levels below this one.
+        """
+        table = self
+        while True:
+            for entry in table.array:
+                if entry is not None:
+                    break
+            if not isinstance(entry[1], InfiniteHashTable):
+                return entry
+            table = entry[1]
 
     def __len__(self) -> int:
         return self.count
@@ -110,38 +222,196 @@ class InfiniteHashTable(Generic[K, V]):
         :raises KeyError: when the key doesn't exist.
         """
         res = []
-        pos = self.hash(key)
-
-        if self.array[pos] is None:
-            raise KeyError(key)
-        else:
-
-            if self.array[pos][0] == key or type(self.array[pos][1]) is int:
-                res.append(pos)
+        table = self
+        while True:
+            pos = table.hash(key)
+            entry = table.array[pos]
+            if entry is None:
+                raise KeyError(key)
+            res.append(pos)
+            if isinstance(entry[1], InfiniteHashTable):
+                table = entry[1]
+            elif entry[0] == key:
                 return res
             else:
-                res.append(pos)
-                sub_table = self.array[pos][1]
-                return res + sub_table.get_location(key)
+                raise KeyError(key)
 
     def __contains__(self, key: K) -> bool:
         """
         Checks to see if the given key is in the Hash Table
 
-        :complexity: See linear probe.
+        :complexity: See _find.
         """
         try:
-            _ = self[key]
+            self._find(key)
         except KeyError:
             return False
         else:
             return True
 
-    def sort_keys(self, current=None) -> list[str]:
+    def _prefix_table(self, prefix: str) -> tuple[InfiniteHashTable[K, V] | None, tuple[K, V] | None, bool]:
+        """
+        Descend to where the keys starting with prefix are. Returns the table
+        whose keys all share the positions of prefix, or else the one pair
+        that could start with it, or neither when no key can. The last item
+        says whether every key of that table starts with prefix, which is so
+        unless a mixed sub-table was passed on the way.
+
+        :complexity: O(len(prefix) * hash(prefix))
+        """
+        table = self
+        exact = True
+        while table.level < len(prefix):
+            entry = table.array[table.hash(prefix)]
+            if entry is None:
+                return None, None, True
+            if not isinstance(entry[1], InfiniteHashTable):
+                return None, entry, True
+            if not self._reaches(entry[1], prefix, table.level + 1):
+                return None, None, True
+            if entry[1].mixed:
+                exact = False
+            elif not self._matches(entry, prefix, table.level):
+                # All of its keys have other characters than prefix.
+                return None, None, True
+            table = entry[1]
+        return table, None, exact
+
+    def _reaches(self, sub_table: InfiniteHashTable[K, V], prefix: str, level: int) -> bool:
+        """
+        Whether prefix shares the positions of the keys in sub_table on the
+        levels from the given one down to the sub-table's. No level is
+        skipped here, so it always does.
+        """
+        return True
+
+    def _matches(self, entry: tuple[str, InfiniteHashTable[K, V]], prefix: str, level: int) -> bool:
+        """
+        Whether prefix has the characters of the keys below the sub-table
+        entry, which is not mixed, from the given level down to the
+        sub-table's, as far as prefix goes. Here that is the one character
+        stored in the entry.
+        """
+        return entry[0] == prefix[level]
+
+    def keys_with_prefix(self, prefix: str, limit: int | None = None) -> Iterator[K]:
+        """
+        Returns an iterator of the keys starting with prefix, in sorted order
+        (see iter_sorted), stopping after limit keys if it is given.
+
+        :complexity: O(len(prefix) * hash(prefix)) to reach the prefix's level,
+                     then see iter_sorted for the tables below it. Past a mixed
+                     sub-table, the k keys below are also sorted in O(k * log(k) * comp(K)).
+        """
+        table, entry, exact = self._prefix_table(prefix)
+        if table is not None:
+            keys = self.iter_sorted(table)
+            if not exact:
+                keys = (key for key in keys if key.startswith(prefix))
+            if not exact or (table.mixed and table.level > len(prefix)):
+                # iter_sorted starts at the table's level, so keys differing on
+                # skipped levels between the prefix and there need comparing.
+                keys = iter(sorted(keys))
+        elif entry is not None and entry[0].startswith(prefix):
+            keys = iter([entry[0]])
+        else:
+            keys = iter([])
+        return islice(keys, limit)
+
+    def count_prefix(self, prefix: str) -> int:
+        """
+        Returns the number of keys starting with prefix.
+
+        This is the count of the table at the prefix's level, unless a mixed
+        sub-table was passed on the way there. Then the keys below it are
+        checked one by one, as some of them may have other characters than
+        prefix in the same positions.
+
+        :complexity: O(len(prefix) * hash(prefix)) without mixed sub-tables on the way,
+                     otherwise O(TABLE_SIZE + len(prefix)) for each table below the prefix's level.
+        """
+        table, entry, exact = self._prefix_table(prefix)
+        if table is not None:
+            if exact:
+                return table.count
+            return sum(1 for key in self._iter_keys(table) if key.startswith(prefix))
+        return int(entry is not None and entry[0].startswith(prefix))
+
+    def iter_sorted(self, current: InfiniteHashTable[K, V] | None = None) -> Iterator[K]:
+        """
+        Returns an iterator of the keys in current, or this table by default,
+        in lexicographically sorted order.
+
+        Each table's entries are put in order of their character at its
+        level, see _sorted_entries, and walked in that order, so keys are
+        only compared within mixed sub-tables.
+
+        :complexity: O(TABLE_SIZE * log(TABLE_SIZE)) for each table walked, plus
+                     O(k * log(k) * comp(K)) for each mixed sub-table of k keys.
+        """
+        if current is None:
+            current = self
+        stack = [iter(self._sorted_entries(current))]
+        while stack:
+            for item in stack[-1]:
+                if isinstance(item, InfiniteHashTable):
+                    stack.append(iter(self._sorted_entries(item)))
+                    break
+                if isinstance(item, list):
+                    yield from item
+                else:
+                    yield item
+            else:
+                stack.pop()
+
+    def _sorted_entries(self, table: InfiniteHashTable[K, V]) -> list[K | list[K] | InfiniteHashTable[K, V]]:
+        """
+        Returns the keys and sub-tables of table in order of their character
+        at its level, the end of a key first. The keys of a mixed sub-table
+        do not all have the character in its slot, so they are sorted and
+        split by that character instead, each run in a list of its own.
+
+        :complexity: O(TABLE_SIZE * log(TABLE_SIZE)), plus O(k * log(k) * comp(K))
+                     for each mixed sub-table of k keys.
+        """
+        level = table.level
+        ordered = []
+        for entry in table.array:
+            if entry is None:
+                continue
+            key, child = entry
+            if not isinstance(child, InfiniteHashTable):
+                ordered.append((key[level:level + 1], key))
+            elif not child.mixed:
+                ordered.append((key, child))
+            else:
+                keys = sorted(self._iter_keys(child))
+                for char, run in groupby(keys, key=lambda key: key[level]):
+                    ordered.append((char, list(run)))
+        # Entries in different slots have different characters, so none tie.
+        ordered.sort(key=lambda item: item[0])
+        return [item for _, item in ordered]
+
+    def _iter_keys(self, table: InfiniteHashTable[K, V]) -> Iterator[K]:
+        """
+        Returns an iterator of the keys in table, in no particular order.
+
+        :complexity: O(TABLE_SIZE) for each table walked.
+        """
+        stack = [table]
+        while stack:
+            for entry in stack.pop().array:
+                if entry is None:
+                    continue
+                if isinstance(entry[1], InfiniteHashTable):
+                    stack.append(entry[1])
+                else:
+                    yield entry[0]
+
+    def sort_keys(self, current: InfiniteHashTable[K, V] | None = None) -> list[str]:
         """
         Returns all keys currently in the table in lexicographically sorted order.
 
-        :complexity: O(Nlog(N)) where N is the number of keys in list.
+        :complexity: See iter_sorted.
         """
-        self.keys = mergesort(self.keys)
-        return self.keys    
+        return list(self.iter_sorted(current))
@@ -0,0 +1,186 @@
+from __future__ import annotations
+from typing import TypeVar
+from infinite_hash_table import InfiniteHashTable
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class RadixInfiniteHashTable(InfiniteHashTable[K, V]):
+    """
+    Path-compressed Infinite Hash Table.
+
+    Where an InfiniteHashTable adds a sub-table for every level at which
+    colliding keys share a position, this only adds one at the level where
+    they finally part ways. The levels skipped on the way down are where
+    every key below shares the positions of prefix_key, the key the
+    sub-table was made for, so a chain of nearly empty sub-tables becomes
+    a single edge.
+
+    Lookups step straight from one branching level to the next, and the
+    final key comparison confirms the skipped levels. get_location still
+    answers with a position for every level of the uncompressed table,
+    worked out from the key itself.
+
+    A sub-table is mixed once the keys below it have different characters
+    on any of the levels from its parent's down to its own, including the
+    skipped ones, and prefix_key's characters stand for all of its keys
+    there while it is not.
+
+    Keys that are not strings need `hash_at` overwritten, rather than `hash`.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    __slots__ = ("prefix_key",)
+
+    def __init__(self, level: int = 0, prefix_key: K | None = None) -> None:
+        super().__init__(level)
+        self.prefix_key = prefix_key
+
+    def _first_difference(self, key: K, other: K, start: int, stop: int | None = None) -> int:
+        """
+        Returns the first level from start, and before stop if given, where
+        key and other have different positions, or stop if there is none.
+
+        :complexity: O((stop - start) * hash_at(key)) or until the keys differ.
+        :raises ValueError: when stop is None and the keys cannot be told apart by hash.
+        """
+        level = start
+        while stop is None or level < stop:
+            if self.hash_at(key, level) != self.hash_at(other, level):
+                return level
+            if level >= len(key) and level >= len(other):
+                raise ValueError("Keys " + str(key) + " and " + str(other) + " have the same hashes")
+            level += 1
+        return stop
+
+    def _reaches(self, sub_table: InfiniteHashTable[K, V], prefix: str, level: int) -> bool:
+        """
+        Whether prefix shares the positions of the keys in sub_table on the
+        levels skipped above it, as far as prefix goes.
+
+        :complexity: O(D * hash_at(prefix)) where D is the number of levels checked.
+        """
+        stop = min(sub_table.level, len(prefix))
+        return self._first_difference(prefix, sub_table.prefix_key, level, stop) == stop
+
+    def _matches(self, entry: tuple[str, InfiniteHashTable[K, V]], prefix: str, level: int) -> bool:
+        """
+        Whether prefix has the characters of prefix_key on the levels from
+        the given one down to the sub-table's, as far as prefix goes. The
+        sub-table is not mixed, so its keys all have those characters too.
+        """
+        sub_table = entry[1]
+        stop = min(sub_table.level, len(prefix))
+        return prefix[level:stop] == sub_table.prefix_key[level:stop]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        """
+        Set an (key, value) pair in our hash table.
+
+        When the key parts ways with a skipped level or a colliding key, a
+        single sub-table is added at the level where they part.
+
+        :complexity: O(D * hash_at(key)) where D is the level the key ends up at.
+        :raises ValueError: when key cannot be told apart from a key in the table by hash.
+        """
+        path = []
+        table = self
+        while True:
+            path.append(table)
+            pos = table.hash(key)
+            entry = table.array[pos]
+            if entry is None:
+                table.array[pos] = (key, value)
+                break
+
+            child = entry[1]
+            if isinstance(child, InfiniteHashTable):
+                level = self._first_difference(key, child.prefix_key, table.level + 1, child.level)
+                if level == child.level:
+                    if key[table.level:level] != child.prefix_key[table.level:level]:
+                        child.mixed = True
+                    table = child
+                    continue
+                # The key parts ways on the skipped levels above child.
+                other_pos, other = self.hash_at(child.prefix_key, level), (child.prefix_key[level], child)
+                count = child.count
+                mixed = child.mixed or key[table.level:level] != child.prefix_key[table.level:level]
+            else:
+                if entry[0] == key:
+                    # Update, the count is unchanged.
+                    table.array[pos] = (key, value)
+                    return
+                level = self._first_difference(key, entry[0], table.level + 1)
+                other_pos, other = self.hash_at(entry[0], level), entry
+                count = 1
+                mixed = key[table.level:level] != entry[0][table.level:level]
+
+            sub_table = type(self)(level, key)
+            sub_table.mixed = mixed
+            sub_table.array[other_pos] = other
+            sub_table.array[self.hash_at(key, level)] = (key, value)
+            sub_table.count = count + 1
+            table.array[pos] = (key[table.level], sub_table)
+            break
+
+        for table in path:
+            table.count += 1
+
+    def __delitem__(self, key: K) -> None:
+        """
+        Deletes a (key, value) pair in our hash table.
+
+        A sub-table left holding a single key is replaced by that key's pair,
+        and one left with a single sub-table below it is replaced by that sub-table.
+
+        :complexity: O(D * hash_at(key) + TABLE_SIZE) where D is the number of sub-tables on the way to the key.
+        :raises KeyError: when the key doesn't exist.
+        """
+        path = []
+        table = self
+        while True:
+            pos = table.hash(key)
+            path.append((table, pos))
+            entry = table.array[pos]
+            if entry is None:
+                raise KeyError(key)
+            if isinstance(entry[1], InfiniteHashTable):
+                table = entry[1]
+            elif entry[0] == key:
+                break
+            else:
+                raise KeyError(key)
+
+        table.array[pos] = None
+        for table, _ in path:
+            table.count -= 1
+
+        # Collapse the highest sub-table left with a single key.
+        for parent, pos in path:
+            entry = parent.array[pos]
+            if entry is not None and isinstance(entry[1], InfiniteHashTable) and entry[1].count == 1:
+                parent.array[pos] = entry[1]._only_entry()
+                return
+
+        # The table the key was deleted from may no longer branch.
+        if len(path) > 1:
+            parent, pos = path[-2]
+            remaining = [entry for entry in table.array if entry is not None]
+            if len(remaining) == 1 and isinstance(remaining[0][1], InfiniteHashTable):
+                child = remaining[0][1]
+                # The skipped levels of both are now child's.
+                child.mixed = child.mixed or table.mixed
+                parent.array[pos] = (parent.array[pos][0], child)
+
+    def get_location(self, key: K) -> list[int]:
+        """
+        Get the sequence of positions required to access this key, as if no
+        levels were skipped.
+
+        :complexity: O(D * hash_at(key)) where D is the level the key is at.
+        :raises KeyError: when the key doesn't exist.
+        """
+        table, _ = self._find(key)
+        return [self.hash_at(key, level) for level in range(table.level + 1)]
@@ -21,10 +21,10 @@ if __name__ == "__main__":
 
     while args.task == '':
         try:
-            task = input("Enter task [1 - 6], leave blank to run all tests: ")
+            task = input("Enter task [1 - 7], leave blank to run all tests: ")
             if task == '':
                 break
-            if 1 <= int(task) <= 6:
+            if 1 <= int(task) <= 7:
                 args.task = task
         except ValueError:
             pass
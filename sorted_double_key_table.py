@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import Iterable, TypeVar
+from double_key_table import DoubleKeyTable
+from data_structures.skip_list import SkipList
+
+K1 = TypeVar('K1')
+K2 = TypeVar('K2')
+V = TypeVar('V')
+
+
+class SortedDoubleKeyTable(DoubleKeyTable[K1, K2, V]):
+    """
+    Double Hash Table that also keeps its keys in order.
+
+    Alongside the hash table, key1_index holds the top-level keys and
+    pair_index the (key1, key2) pairs, both in skip lists. Pairs sort by
+    key1 first, so the bottom-level keys of one top-level key are next to
+    each other in pair_index. Sorted keys, ranges and prefixes are then read
+    straight off the indices in O(log N + k), without sorting, where N is
+    the number of keys and k the number returned.
+
+    Lookups only use the hash table. Setting and deleting also update the
+    indices, in O(log N) on average.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        """
+        Initialise the Hash Table. Any arguments are passed on to
+        DoubleKeyTable, see its constructor.
+        """
+        super().__init__(*args, **kwargs)
+        self.key1_index: SkipList[K1] = SkipList()
+        self.pair_index: SkipList[tuple[K1, K2]] = SkipList()
+
+    def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
+        """
+        :complexity: See DoubleKeyTable.__setitem__ and SkipList.add.
+        """
+        key1, key2 = key
+        count = self.count
+        super().__setitem__(key, data)
+        self.pair_index.add((key1, key2))
+        if self.count != count:
+            self.key1_index.add(key1)
+
+    def __delitem__(self, key: tuple[K1, K2]) -> None:
+        """
+        :complexity: See DoubleKeyTable.__delitem__ and SkipList.discard.
+        :raises KeyError: when the key doesn't exist.
+        """
+        key1, key2 = key
+        count = self.count
+        super().__delitem__(key)
+        self.pair_index.discard((key1, key2))
+        if self.count != count:
+            self.key1_index.discard(key1)
+
+    def set_many(self, items: Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        :complexity: See DoubleKeyTable.set_many, plus O(log N) for each pair.
+        """
+        items = list(items)
+        try:
+            super().set_many(items)
+        finally:
+            # Only index the pairs that went in, should a resize have failed part way.
+            for key, _ in items:
+                if key in self:
+                    self.pair_index.add(tuple(key))
+                    self.key1_index.add(key[0])
+
+    def delete_many(self, keys: Iterable[tuple[K1, K2]]) -> None:
+        """
+        :complexity: See DoubleKeyTable.delete_many, plus O(log N) for each pair.
+        :raises KeyError: when a key doesn't exist.
+        """
+        keys = list(keys)
+        try:
+            super().delete_many(keys)
+        finally:
+            # Only drop the pairs that went, should a key have been missing part way.
+            for key in keys:
+                if key not in self:
+                    self.pair_index.discard(tuple(key))
+                    if self._find_sub_table(key[0]) is None:
+                        self.key1_index.discard(key[0])
+
+    def keys_sorted(self, key: K1 | None = None) -> list[K1 | K2]:
+        """
+        key = None: returns all top-level keys in order.
+        key = x: returns all bottom-level keys for top-level key x in order.
+
+        :complexity: O(log N + k) where k is the number of keys returned.
+        :raises KeyError: when key is not None and not in the table.
+        """
+        if key is None:
+            return list(self.key1_index)
+        if key not in self.key1_index:
+            raise KeyError(key)
+        result = []
+        for key1, key2 in self.pair_index.iter_from((key,)):
+            if key1 != key:
+                break
+            result.append(key2)
+        return result
+
+    def range(self, low: K1 | K2, high: K1 | K2, key: K1 | None = None) -> list[K1 | K2]:
+        """
+        key = None: returns the top-level keys from low up to, but not including, high, in order.
+        key = x: returns the bottom-level keys of top-level key x from low up to high, in order.
+
+        :complexity: O(log N + k) where k is the number of keys returned.
+        """
+        if key is None:
+            return list(self.key1_index.range(low, high))
+        return [key2 for _, key2 in self.pair_index.range((key, low), (key, high))]
+
+    def prefix(self, prefix: str, key: K1 | None = None) -> list[K1 | K2]:
+        """
+        key = None: returns the top-level keys starting with prefix, in order.
+        key = x: returns the bottom-level keys of top-level key x starting with prefix, in order.
+
+        :complexity: O(log N + k) where k is the number of keys returned.
+        """
+        if key is None:
+            return list(self.key1_index.prefix(prefix))
+        result = []
+        for key1, key2 in self.pair_index.iter_from((key, prefix)):
+            if key1 != key or not key2.startswith(prefix):
+                break
+            result.append(key2)
+        return result
@@ -0,0 +1,60 @@
+import sys
+import threading
+import unittest
+from ed_utils.decorators import number
+
+from concurrent_double_key_table import ConcurrentDoubleKeyTable
+
+
+class TestConcurrentDoubleKeyTable(unittest.TestCase):
+
+    @number("3.16")
+    def test_threads(self):
+        for compact in (False, True):
+            dt = ConcurrentDoubleKeyTable(stripes=4, compact=compact)
+            errors = []
+
+            def work(thread):
+                try:
+                    for i in range(400):
+                        key = ("k" + str(i % 50), "t" + str(thread) + "-" + str(i))
+                        dt[key] = i
+                        self.assertEqual(dt[key], i)
+                        if i % 3 == 0:
+                            del dt[key]
+                            self.assertNotIn(key, dt)
+                    # Empty some top-level keys entirely, removing them from the outer table.
+                    for i in range(400):
+                        if i % 50 >= 40 and i % 3 != 0:
+                            del dt["k" + str(i % 50), "t" + str(thread) + "-" + str(i)]
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=work, args=(t,)) for t in range(6)]
+            interval = sys.getswitchinterval()
+            # Switch threads as often as possible, to mix their operations up.
+            sys.setswitchinterval(1e-6)
+            try:
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                sys.setswitchinterval(interval)
+
+            self.assertEqual(errors, [])
+            expected = {("k" + str(i % 50), "t" + str(t) + "-" + str(i)): i
+                        for t in range(6) for i in range(400) if i % 3 != 0 and i % 50 < 40}
+            self.assertEqual(set(dt.iter_items()), {(k1, k2, v) for (k1, k2), v in expected.items()})
+            self.assertEqual(len(dt), 40)
+
+    @number("3.17")
+    def test_options(self):
+        self.assertRaises(ValueError, lambda: ConcurrentDoubleKeyTable(incremental_rehash=True))
+        self.assertRaises(ValueError, lambda: ConcurrentDoubleKeyTable(stripes=0))
+        dt = ConcurrentDoubleKeyTable()
+        dt.set_many([(("a", "x"), 1), (("b", "y"), 2)])
+        self.assertEqual(dt.get_many([("b", "y"), ("a", "x")]), [2, 1])
+        dt.delete_many([("a", "x")])
+        self.assertEqual(dt.keys(), ["b"])
+        self.assertEqual(dt.values("b"), [2])
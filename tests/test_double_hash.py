@@ -1,7 +1,10 @@
+import random
 import unittest
+from ctypes import py_object, sizeof
 from ed_utils.decorators import number
 
-from double_key_table import DoubleKeyTable
+from double_key_table import DoubleKeyTable, SubTable
+from tests.workloads import random_pair, random_workload
 
 
 class TestDoubleHash(unittest.TestCase):
@@ -136,3 +139,217 @@ class TestDoubleHash(unittest.TestCase):
         # with an iterator.
         self.assertRaises(BaseException, lambda: next(key_iterator))
         self.assertRaises(BaseException, lambda: next(value_iterator))
+
+    @number("3.6")
+    def test_load_factors(self):
+        dt = DoubleKeyTable(sizes=[5, 13, 29], internal_sizes=[5, 13], max_load_factor=0.75, min_load_factor=0.25)
+        for i in range(10):
+            dt["k" + str(i), "x"] = i
+        # 10 top-level keys is over three quarters of 13.
+        self.assertEqual(dt.table_size, 29)
+        self.assertEqual(len(dt), 10)
+
+        for i in range(8):
+            del dt["k" + str(i), "x"]
+        self.assertEqual(len(dt), 2)
+        # Shrunk twice, 2 top-level keys fit in 5 slots.
+        self.assertEqual(dt.table_size, 5)
+        self.assertEqual(dt["k8", "x"], 8)
+        self.assertEqual(dt["k9", "x"], 9)
+
+        # Default sizes extend past the end of TABLE_SIZES.
+        self.assertTrue(DoubleKeyTable().extend_sizes)
+        self.assertFalse(dt.extend_sizes)
+
+        self.assertRaises(ValueError, lambda: DoubleKeyTable(max_load_factor=1))
+        dt = DoubleKeyTable(max_load_factor=0.99)
+        for i in range(100):
+            dt["k" + str(i), "x"] = i
+        self.assertEqual(len(dt), 100)
+
+    @number("3.7")
+    def test_iter_items(self):
+        dt = DoubleKeyTable()
+        pairs = {("May", "Jim"): 1, ("May", "Tom"): 2, ("Kim", "Tim"): 3}
+        for key, value in pairs.items():
+            dt[key] = value
+
+        items = dt.iter_items()
+        first = next(items)
+        self.assertIn((first[0], first[1]), pairs)
+        rest = list(items)
+        self.assertEqual({(k1, k2): v for k1, k2, v in [first] + rest}, pairs)
+        self.assertEqual(set(dt.iter_keys("May")), {"Jim", "Tom"})
+        self.assertRaises(KeyError, lambda: dt.iter_keys("Amy"))
+
+    @number("3.8")
+    def test_incremental_rehash(self):
+        dt = DoubleKeyTable(incremental_rehash=True)
+        migrations = 0
+
+        def check_migration():
+            nonlocal migrations
+            if dt.old_array is not None:
+                migrations += 1
+                # Old slots are only moved a few at a time.
+                self.assertLessEqual(dt.migrate_position, (migrations + 1) * dt.MIGRATION_STEP)
+            else:
+                migrations = 0
+
+        expected = random_workload([dt], random_pair(300, 3), 3000, 0.3, check=check_migration)
+        for key, value in expected.items():
+            self.assertEqual(dt[key], value)
+        self.assertEqual(len(dt), len({key1 for key1, _ in expected}))
+        self.assertEqual(set(dt.iter_items()), {(k1, k2, v) for (k1, k2), v in expected.items()})
+
+        # Lookups while iterating mid-rehash do not move entries ahead of the iterator.
+        dt = DoubleKeyTable(incremental_rehash=True)
+        key1 = 0
+        while dt.old_array is None or dt.migrate_position > 0:
+            dt["k" + str(key1), "x"] = key1
+            key1 += 1
+        # Reporting memory leaves the rehash where it is.
+        usage = dt.memory_usage()
+        self.assertIsNotNone(dt.old_array)
+        self.assertEqual(dt.migrate_position, 0)
+        self.assertEqual(usage["inner_tables"], key1)
+        self.assertEqual(usage["outer"], dt.array.memory_usage() + dt.old_array.memory_usage())
+        items = [(k1, k2) for k1, k2, v in dt.iter_items() if dt[k1, k2] is not None]
+        self.assertEqual(len(items), key1)
+        self.assertEqual(len(set(items)), key1)
+        self.assertEqual(len([k1 for k1 in dt.iter_keys() if ("k0", "x") in dt]), key1)
+
+    @number("3.9")
+    def test_rehash_moves_sub_tables(self):
+        dt = DoubleKeyTable()
+        dt["May", "Jim"] = 1
+        sub_table = dt._sub_table("May")
+        for i in range(20):
+            dt["k" + str(i), "x"] = i
+        self.assertGreater(dt.table_size, 5)
+        self.assertIs(dt._sub_table("May"), sub_table)
+
+    @number("3.12")
+    def test_batch_operations(self):
+        dt = DoubleKeyTable()
+        items = [(("k" + str(i % 40), "x" + str(i)), i) for i in range(400)]
+        dt.set_many(items)
+        self.assertEqual(len(dt), 40)
+        # Grown once for the whole batch, and only to the first size that fits.
+        self.assertEqual(dt.table_size, 97)
+        self.assertEqual(dt._sub_table("k0").table_size, 29)
+
+        keys = [key for key, _ in items]
+        random.Random(1008).shuffle(keys)
+        self.assertEqual(dt.get_many(keys), [int(key2[1:]) for _, key2 in keys])
+        self.assertRaises(KeyError, lambda: dt.get_many([("k0", "x0"), ("k0", "x1")]))
+
+        dt.set_many([(("k0", "x0"), -1), (("new", "x"), -2)])
+        self.assertEqual(dt["k0", "x0"], -1)
+        self.assertEqual(len(dt), 41)
+
+        dt.delete_many([key for key in keys if key[0] != "k1"] + [("new", "x")])
+        self.assertEqual(len(dt), 1)
+        self.assertEqual(dt.table_size, 5)
+        self.assertEqual(dt.keys(), ["k1"])
+        self.assertEqual(len(dt.keys("k1")), 10)
+        self.assertEqual(dt._sub_table("k1").table_size, 29)
+
+        # A key2 missing part way through a group leaves the table consistent.
+        dt = DoubleKeyTable()
+        dt["a", "x"] = 1
+        dt["b", "y"] = 2
+        self.assertRaises(KeyError, lambda: dt.delete_many([("a", "x"), ("a", "missing")]))
+        self.assertEqual(len(dt), 1)
+        self.assertEqual(dt.keys(), ["b"])
+        self.assertRaises(KeyError, lambda: dt.keys("a"))
+        for i in range(20):
+            dt["k" + str(i), "x"] = i
+        self.assertEqual(len(dt), 21)
+        self.assertEqual(len(dt.keys()), 21)
+
+    @number("3.13")
+    def test_compact(self):
+        dt = DoubleKeyTable(compact=True)
+        plain = DoubleKeyTable()
+        for i in range(100):
+            dt["k" + str(i), "x"] = i
+            plain["k" + str(i), "x"] = i
+        usage = dt.memory_usage()
+        self.assertEqual(usage["inner_tables"], 0)
+        self.assertEqual(usage["inline_entries"], 100)
+        # Slot bytes only, as for the inner tables: a key and a value reference each.
+        self.assertEqual(usage["inline"], 100 * 2 * sizeof(py_object))
+        self.assertLess(usage["total"], plain.memory_usage()["total"])
+
+        # Lookups leave the pair inline.
+        pos1 = dt._linear_probe("k5", "x", False)[0]
+        self.assertEqual(dt._linear_probe("k5", "x", False), (pos1, 0))
+        self.assertRaises(KeyError, lambda: dt._linear_probe("k5", "y", False))
+        self.assertEqual(dt.memory_usage()["inner_tables"], 0)
+
+        # Promoted on the second key2, demoted when back down to one.
+        dt["k0", "y"] = -1
+        self.assertEqual(dt.memory_usage()["inner_tables"], 1)
+        self.assertEqual(set(dt.keys("k0")), {"x", "y"})
+        del dt["k0", "x"]
+        self.assertEqual(dt.memory_usage()["inner_tables"], 0)
+        self.assertEqual(dt["k0", "y"], -1)
+        self.assertRaises(KeyError, lambda: dt["k0", "x"])
+
+        dt.set_many([(("k1", "y"), 1), (("k1", "z"), 2), (("new", "x"), 3)])
+        self.assertEqual(dt.get_many([("k1", "x"), ("k1", "z"), ("new", "x")]), [1, 2, 3])
+        dt.delete_many([("k1", "y"), ("k1", "z"), ("new", "x"), ("k2", "x")])
+        self.assertEqual(len(dt), 99)
+        self.assertEqual(dt.memory_usage()["inner_tables"], 0)
+
+        dt = DoubleKeyTable(compact=True)
+        expected = random_workload([dt], random_pair(100, 3), 3000, 0.4)
+        self.assertEqual(set(dt.iter_items()), {(k1, k2, v) for (k1, k2), v in expected.items()})
+        self.assertEqual(len(dt), len({key1 for key1, _ in expected}))
+
+    @number("3.20")
+    def test_sub_tables(self):
+        def assert_homes(dt, key1):
+            # Every pair sits its recorded number of probes past its hash2 position.
+            sub_table = dt._find_sub_table(key1)
+            for position in sub_table._occupied():
+                key2 = sub_table.key_array[position]
+                home = (position - sub_table.probe_array[position]) % sub_table.table_size
+                self.assertEqual(home, dt.hash2(key2, sub_table))
+                self.assertEqual(sub_table.hash(key2), dt.hash2(key2, sub_table))
+
+        dt = DoubleKeyTable()
+        for i in range(30):
+            dt["k" + str(i % 3), "x" + str(i)] = i
+        for key1 in dt.keys():
+            sub_table = dt._find_sub_table(key1)
+            self.assertIsInstance(sub_table, SubTable)
+            self.assertNotIn("hash", sub_table.__dict__)
+            self.assertIs(sub_table.owner, dt)
+            # The cached full hashes reduce to exactly hash2.
+            for position in sub_table._occupied():
+                key2 = sub_table.key_array[position]
+                self.assertEqual(sub_table.hash_array[position] % sub_table.table_size, dt.hash2(key2, sub_table))
+            assert_homes(dt, key1)
+        self.assertIsNone(dt._find_sub_table("missing"))
+
+        class FirstLetterTable(DoubleKeyTable):
+            def hash2(self, key, sub_table):
+                return ord(key[0]) % sub_table.table_size
+
+        dt = FirstLetterTable(internal_sizes=[5, 13, 29, 53])
+        self.assertFalse(dt._default_hash2())
+        keys = ["x" + str(i) for i in range(20)]
+        for i, key2 in enumerate(keys):
+            dt["May", key2] = i
+            assert_homes(dt, "May")
+        # Grown, and so rehashed, with hash2.
+        self.assertEqual(dt._find_sub_table("May").table_size, 53)
+        for i, key2 in enumerate(keys):
+            self.assertEqual(dt["May", key2], i)
+        for key2 in keys[::2]:
+            del dt["May", key2]
+            assert_homes(dt, "May")
+        self.assertEqual(sorted(dt.keys("May")), sorted(keys[1::2]))
+        self.assertRaises(KeyError, lambda: dt["May", "x0"])
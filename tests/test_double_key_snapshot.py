@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from double_key_table import DoubleKeyTable
+from double_key_snapshot import save_snapshot, load_snapshot, MappedDoubleKeyTable
+from data_structures.hashing import string_hash
+
+
+class TestDoubleKeySnapshot(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def make_table(self, **kwargs):
+        dt = DoubleKeyTable(**kwargs)
+        for i in range(300):
+            dt["k" + str(i % 40), "x" + str(i)] = [i]
+        dt["solo", "y"] = {"a": 1}
+        return dt
+
+    @number("3.14")
+    def test_load_snapshot(self):
+        for compact in (False, True):
+            dt = self.make_table(compact=compact)
+            save_snapshot(dt, self.path)
+
+            string_hash.cache_clear()
+            loaded = load_snapshot(self.path, compact=compact)
+            # Every entry goes straight back into its slot, without hashing.
+            self.assertEqual(string_hash.cache_info().misses, 0)
+            self.assertEqual(loaded.table_size, dt.table_size)
+            self.assertEqual(len(loaded), len(dt))
+            self.assertEqual(list(loaded.iter_items()), list(dt.iter_items()))
+
+            # The loaded table is an ordinary, writable table.
+            loaded["new", "z"] = 1
+            del loaded["k1", "x1"]
+            self.assertEqual(loaded["new", "z"], 1)
+            self.assertNotIn(("k1", "x1"), loaded)
+
+        self.assertRaises(ValueError, lambda: load_snapshot(self.path, sizes=[7, 11]))
+
+    @number("3.15")
+    def test_mapped_snapshot(self):
+        dt = self.make_table(compact=True)
+        save_snapshot(dt, self.path)
+        with MappedDoubleKeyTable(self.path) as mapped:
+            self.assertEqual(mapped["k3", "x3"], [3])
+            self.assertEqual(mapped["solo", "y"], {"a": 1})
+            self.assertIn(("k3", "x43"), mapped)
+            self.assertNotIn(("k3", "x4"), mapped)
+            self.assertNotIn(("solo", "x"), mapped)
+            self.assertRaises(KeyError, lambda: mapped["nope", "x"])
+            self.assertEqual(len(mapped), len(dt))
+            self.assertEqual(mapped.keys(), dt.keys())
+            self.assertEqual(mapped.keys("k3"), dt.keys("k3"))
+            self.assertEqual(mapped.values("k3"), dt.values("k3"))
+            self.assertEqual(list(mapped.iter_items()), list(dt.iter_items()))
+            self.assertRaises(KeyError, lambda: mapped.keys("nope"))
@@ -0,0 +1,51 @@
+import unittest
+from ed_utils.decorators import number
+
+from flat_double_key_table import FlatDoubleKeyTable
+from tests.workloads import random_pair, random_workload
+
+
+class TestFlatDoubleKeyTable(unittest.TestCase):
+
+    @number("3.10")
+    def test_flat_table(self):
+        ft = FlatDoubleKeyTable()
+        ft["Tim", "Jen"] = 1
+        ft["Amy", "Ben"] = 2
+        ft["May", "Ben"] = 3
+        ft["May", "Tom"] = 5
+        ft["Tim", "Bob"] = 6
+        ft["Tim", "Bob"] = 7    # Update
+
+        self.assertEqual(len(ft), 3)
+        self.assertEqual(ft["Tim", "Bob"], 7)
+        self.assertIn(("May", "Tom"), ft)
+        self.assertNotIn(("Tom", "May"), ft)
+        self.assertEqual(set(ft.keys()), {"Tim", "Amy", "May"})
+        self.assertEqual(set(ft.values()), {1, 2, 3, 5, 7})
+        self.assertIsNone(ft.index)
+        self.assertEqual(set(ft.keys("Tim")), {"Jen", "Bob"})
+        self.assertIsNotNone(ft.index)
+
+        # The index is kept up to date once built.
+        ft["Tim", "Liz"] = 8
+        del ft["Tim", "Jen"]
+        del ft["Amy", "Ben"]
+        self.assertEqual(set(ft.keys("Tim")), {"Bob", "Liz"})
+        self.assertEqual(set(ft.values("Tim")), {7, 8})
+        self.assertRaises(KeyError, lambda: ft.keys("Amy"))
+        self.assertEqual(len(ft), 2)
+
+        # Takes DoubleKeyTable's size arguments.
+        ft = FlatDoubleKeyTable(sizes=[5, 13, 29], internal_sizes=[5, 13])
+        for i in range(10):
+            ft["k" + str(i % 3), "x" + str(i)] = i
+        self.assertEqual(ft.table_size, 29)
+        self.assertEqual(len(ft), 3)
+
+    @number("3.11")
+    def test_flat_matches_dict(self):
+        ft = FlatDoubleKeyTable()
+        expected = random_workload([ft], random_pair(50, 20), 2000, 0.4)
+        self.assertEqual(set(ft.iter_items()), {(k1, k2, v) for (k1, k2), v in expected.items()})
+        self.assertEqual(len(ft), len({key1 for key1, _ in expected}))
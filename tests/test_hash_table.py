@@ -0,0 +1,351 @@
+import math
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.hash_table import LinearProbeTable, FullError, OCCUPIED, DELETED
+from data_structures.referential_array import TypedArrayR
+from double_key_table import DoubleKeyTable
+from data_structures.probe_policy import LinearProbe, QuadraticProbe, DoubleHashProbe, RobinHoodProbe
+from tests.workloads import random_workload
+
+
+class TestLinearProbeTable(unittest.TestCase):
+
+    @number("7.1")
+    def test_parallel_storage(self):
+        # Disable resizing / rehashing.
+        lp = LinearProbeTable(sizes=[7])
+        lp.hash = lambda k: ord(k[0]) % 7
+
+        lp["abc"] = 1
+        lp["hat"] = 2   # Collides with "abc" and probes to the next slot.
+        lp["abc"] = 3   # Update in place.
+
+        self.assertEqual(len(lp), 2)
+        self.assertEqual(lp._linear_probe("abc", False), 6)
+        self.assertEqual(lp._linear_probe("hat", False), 0)
+        self.assertEqual(lp.key_array[6], "abc")
+        self.assertEqual(lp.value_array[6], 3)
+        self.assertEqual(lp.hash_array[6], lp.full_hash("abc"))
+        self.assertEqual(lp.state_array[0], OCCUPIED)
+        self.assertEqual(set(lp.keys()), {"abc", "hat"})
+        self.assertEqual(set(lp.values()), {2, 3})
+
+    @number("7.2")
+    def test_delete_and_resize(self):
+        lp = LinearProbeTable()
+        words = ["w" + str(i) for i in range(200)]
+        for i, word in enumerate(words):
+            lp[word] = i
+        self.assertEqual(len(lp), 200)
+        self.assertGreater(lp.table_size, 400)
+
+        for word in words[::2]:
+            del lp[word]
+        self.assertEqual(len(lp), 100)
+        for i, word in enumerate(words):
+            if i % 2 == 0:
+                self.assertNotIn(word, lp)
+            else:
+                self.assertEqual(lp[word], i)
+        self.assertRaises(KeyError, lambda: lp["missing"])
+
+    @number("7.3")
+    def test_size_independent_hash(self):
+        lp = LinearProbeTable()
+        full = lp.full_hash("hostname")
+        self.assertEqual(lp.hash("hostname"), full % lp.table_size)
+        for i in range(10):
+            lp[str(i)] = i
+        # The full hash survives resizing, only the reduction changes.
+        self.assertEqual(lp.full_hash("hostname"), full)
+        self.assertEqual(lp.hash("hostname"), full % lp.table_size)
+
+    @number("7.4")
+    def test_tombstone_delete(self):
+        # Disable resizing / rehashing.
+        lp = LinearProbeTable(sizes=[7], deletion=LinearProbeTable.DELETE_TOMBSTONE)
+        lp.hash = lambda k: ord(k[0]) % 7
+
+        lp["abc"] = 1   # Slot 6
+        lp["hat"] = 2   # Probes to slot 0
+        del lp["abc"]
+
+        self.assertEqual(lp.state_array[6], DELETED)
+        self.assertEqual(lp.tombstones, 1)
+        # Lookups probe past the tombstone.
+        self.assertEqual(lp._linear_probe("hat", False), 0)
+        self.assertRaises(KeyError, lambda: lp["abc"])
+        # Inserts reuse the first tombstone passed.
+        lp["ovo"] = 3
+        self.assertEqual(lp._linear_probe("ovo", False), 6)
+        self.assertEqual(lp.tombstones, 0)
+        self.assertEqual(len(lp), 2)
+
+    @number("7.5")
+    def test_tombstone_compaction(self):
+        lp = LinearProbeTable(deletion=LinearProbeTable.DELETE_TOMBSTONE, min_load_factor=0)
+        for i in range(40):
+            lp[str(i)] = i
+        size = lp.table_size
+        for i in range(30):
+            del lp[str(i)]
+        # Churn until the tombstones trigger a rehash, which compacts in place.
+        for i in range(30):
+            lp["x" + str(i)] = i
+            del lp["x" + str(i)]
+        self.assertEqual(lp.table_size, size)
+        self.assertLess(lp.tombstones, 30)
+        self.assertEqual(sorted(lp.values()), list(range(30, 40)))
+
+        # Low load factors compact too, rather than growing on every rehash.
+        lp = LinearProbeTable(deletion=LinearProbeTable.DELETE_TOMBSTONE, max_load_factor=0.2, min_load_factor=0)
+        for i in range(100):
+            lp[str(i)] = i
+        for i in range(1000):
+            lp["x" + str(i)] = i
+            del lp["x" + str(i)]
+        # Grown at most once, until the live entries alone fill half the limit.
+        size = lp.table_size
+        self.assertLessEqual(len(lp), lp.COMPACT_RATIO * lp.MAX_LOAD_FACTOR * size)
+        for i in range(1000, 6000):
+            lp["x" + str(i)] = i
+            del lp["x" + str(i)]
+        self.assertEqual(lp.table_size, size)
+        self.assertEqual(len(lp), 100)
+
+        lp = LinearProbeTable(probe_policy=DoubleHashProbe(), max_load_factor=0.2)
+        for i in range(100):
+            lp[str(i)] = i
+        rehashes = lp.rehash_count
+        for i in range(5000):
+            lp["x" + str(i)] = i
+            del lp["x" + str(i)]
+        # Only compactions, each after many operations.
+        self.assertLess(lp.rehash_count - rehashes, 500)
+
+    @number("7.6")
+    def test_probe_policies(self):
+        policies = [LinearProbe(), QuadraticProbe(), DoubleHashProbe(), RobinHoodProbe()]
+        for policy in policies:
+            lp = LinearProbeTable(probe_policy=policy)
+            expected = random_workload([lp], lambda rng: "k" + str(rng.randrange(500)), 3000, 0.4)
+            self.assertEqual(len(lp), len(expected), policy.name)
+            for key, value in expected.items():
+                self.assertEqual(lp[key], value, policy.name)
+            self.assertEqual(set(lp.keys()), set(expected), policy.name)
+            stats = lp.probe_stats()
+            self.assertEqual(stats["policy"], policy.name)
+            self.assertGreaterEqual(stats["average"], 1)
+            self.assertGreaterEqual(stats["max"], stats["average"])
+
+    @number("7.7")
+    def test_robin_hood(self):
+        # Disable resizing / rehashing.
+        lp = LinearProbeTable(sizes=[7], probe_policy=RobinHoodProbe())
+        lp.hash = lambda k: ord(k[0]) % 7
+
+        lp["bat"] = 1   # Home 0
+        lp["abc"] = 2   # Home 6
+        lp["hat"] = 3   # Home 6, takes slot 0 from "bat", which is closer to its home.
+        lp["ovo"] = 4   # Home 6, takes slot 1 from "bat" again.
+        self.assertEqual(lp._linear_probe("hat", False), 0)
+        self.assertEqual(lp._linear_probe("ovo", False), 1)
+        self.assertEqual(lp._linear_probe("bat", False), 2)
+        self.assertEqual(lp.probe_stats()["max"], 3)
+
+        del lp["hat"]
+        # The rest of the cluster shifts back.
+        self.assertEqual(lp._linear_probe("ovo", False), 0)
+        self.assertEqual(lp._linear_probe("bat", False), 1)
+        self.assertEqual(lp["bat"], 1)
+        self.assertRaises(ValueError, lambda: LinearProbeTable(probe_policy=RobinHoodProbe(), deletion=LinearProbeTable.DELETE_TOMBSTONE))
+        self.assertRaises(ValueError, lambda: LinearProbeTable(probe_policy=QuadraticProbe(), deletion=LinearProbeTable.DELETE_BACKSHIFT))
+
+    @number("7.8")
+    def test_load_factors(self):
+        lp = LinearProbeTable(sizes=[5, 13, 29], max_load_factor=0.75, min_load_factor=0.25)
+        for i in range(9):
+            lp[str(i)] = i
+        # 9 entries fit in 13 slots at a load factor of 0.75.
+        self.assertEqual(lp.table_size, 13)
+        lp["9"] = 9
+        self.assertEqual(lp.table_size, 29)
+
+        for i in range(7):
+            del lp[str(i)]
+        # 3 entries is below a quarter of 29, and fits in 13 slots.
+        self.assertEqual(lp.table_size, 13)
+        self.assertEqual(sorted(lp.values()), [7, 8, 9])
+        self.assertRaises(ValueError, lambda: LinearProbeTable(max_load_factor=0.2, min_load_factor=0.3))
+        # A table filled to the brim would have nowhere to insert.
+        self.assertRaises(ValueError, lambda: LinearProbeTable(max_load_factor=1))
+        self.assertRaises(ValueError, lambda: LinearProbeTable(probe_policy=QuadraticProbe(), max_load_factor=0.9))
+
+        lp = LinearProbeTable(max_load_factor=0.99)
+        for i in range(100):
+            lp[str(i)] = i
+        self.assertEqual(len(lp), 100)
+        lp = LinearProbeTable(probe_policy=QuadraticProbe(), max_load_factor=0.5)
+        random_workload([lp], lambda rng: str(rng.randrange(60)), 3000, 0.5)
+
+    @number("7.9")
+    def test_extend_sizes(self):
+        fixed = LinearProbeTable(sizes=[5, 13])
+        extended = LinearProbeTable(sizes=[5, 13], extend_sizes=True)
+        for i in range(60):
+            extended[str(i)] = i
+        for i in range(13):
+            fixed[str(i)] = i
+        # Without extension the table stops growing, and fills up.
+        self.assertEqual(fixed.table_size, 13)
+        self.assertEqual(fixed.TABLE_SIZES, [5, 13])
+        self.assertRaises(FullError, lambda: fixed.__setitem__("full", 0))
+        # With extension primes at least double the last size are generated.
+        self.assertEqual(extended.TABLE_SIZES, [5, 13, 29, 59, 127])
+        self.assertEqual(extended.table_size, 127)
+        self.assertEqual(LinearProbeTable.TABLE_SIZES[-1], 1572869)
+
+    @number("7.10")
+    def test_bulk_load(self):
+        items = [("k" + str(i), i) for i in range(1000)]
+        lp = LinearProbeTable.from_items(items)
+        # Sized once, to the first size that fits 1000 entries at half load.
+        self.assertEqual(lp.table_size, 3079)
+        self.assertEqual(len(lp), 1000)
+        for key, value in items:
+            self.assertEqual(lp[key], value)
+
+        lp.update([("k0", -1), ("new", 5)])
+        self.assertEqual(lp["k0"], -1)
+        self.assertEqual(lp["new"], 5)
+        self.assertEqual(len(lp), 1001)
+
+        small = LinearProbeTable.from_items([("a", 1)], sizes=[5, 13])
+        self.assertEqual(small.table_size, 5)
+
+    @number("7.11")
+    def test_rehash_moves_entries(self):
+        class CountingTable(LinearProbeTable):
+            calls = 0
+            def full_hash(self, key):
+                CountingTable.calls += 1
+                return super().full_hash(key)
+
+        lp = CountingTable()
+        for i in range(100):
+            lp[str(i)] = i
+        # Each insert hashes its key once, rehashes reuse the cached hashes.
+        self.assertEqual(CountingTable.calls, 100)
+        for i in range(100):
+            position, distance = lp._probe(str(i), False)
+            self.assertEqual(lp.probe_array[position], distance)
+            self.assertEqual(lp.value_array[position], i)
+
+    @number("7.12")
+    def test_stats(self):
+        # Disable resizing / rehashing.
+        lp = LinearProbeTable(sizes=[7], track_stats=True)
+        lp.hash = lambda k: ord(k[0]) % 7
+
+        lp["abc"] = 1   # Slot 6
+        lp["hat"] = 2   # Home 6, probes to slot 0
+        lp["bat"] = 3   # Home 0, probes to slot 1
+        lp["dog"] = 4   # Slot 2
+        _ = lp["bat"]
+        _ = "cat" in lp
+
+        stats = lp.stats()
+        self.assertEqual(stats["count"], 4)
+        self.assertEqual(stats["load_factor"], 4 / 7)
+        self.assertEqual(stats["rehashes"], 0)
+        # One cluster of 4, wrapping from slot 6 to slot 2.
+        self.assertEqual(stats["clusters"], {4: 1})
+        self.assertEqual(stats["successful"]["max"], 2)
+        # A miss homed at slot 6 probes 6, 0, 1, 2, 3.
+        self.assertEqual(stats["unsuccessful"]["max"], 5)
+        self.assertEqual(stats["lookups"]["successful"], {"lookups": 1, "average": 2.0, "max": 2})
+        # "cat" is homed at slot 1 and probes 1, 2, 3.
+        self.assertEqual(stats["lookups"]["unsuccessful"], {"lookups": 1, "average": 3.0, "max": 3})
+
+        grown = LinearProbeTable()
+        for i in range(20):
+            grown[str(i)] = i
+        self.assertEqual(grown.stats()["rehashes"], 3)
+        self.assertNotIn("lookups", grown.stats())
+
+    @number("7.13")
+    def test_typed_values(self):
+        lp = LinearProbeTable(value_typecode="d")
+        for i in range(50):
+            lp["k" + str(i)] = i / 2
+        del lp["k0"]
+        self.assertIsInstance(lp.value_array, TypedArrayR)
+        self.assertEqual(lp["k7"], 3.5)
+        self.assertEqual(sorted(lp.values()), [i / 2 for i in range(1, 50)])
+        self.assertRaises(KeyError, lambda: lp["k0"])
+
+        # Values equal to the empty sentinel read back as themselves.
+        lp = LinearProbeTable(value_typecode="d")
+        lp["nan"] = float("nan")
+        for i in range(20):
+            lp["k" + str(i)] = float(i)
+        self.assertTrue(math.isnan(lp["nan"]))
+        self.assertTrue(math.isnan(dict(lp.iter_items())["nan"]))
+        self.assertEqual(sum(math.isnan(value) for value in lp.iter_values()), 1)
+        lp = LinearProbeTable(value_typecode="q")
+        lowest = -(1 << 63)
+        lp["low"] = lowest
+        for i in range(20):
+            lp["k" + str(i)] = i
+        self.assertEqual(lp["low"], lowest)
+        self.assertIn(lowest, list(lp.iter_values()))
+        self.assertIn(lowest, lp.values())
+
+        dt = DoubleKeyTable(value_typecode="q")
+        dt["May", "Jim"] = 3
+        dt["May", "Tom"] = 4
+        self.assertEqual(dt["May", "Tom"], 4)
+        self.assertEqual(set(dt.values("May")), {3, 4})
+
+    @number("7.18")
+    def test_non_string_keys(self):
+        lp = LinearProbeTable()
+        lp.hash = lambda k: k % lp.table_size
+        for i in range(100):
+            lp[i] = str(i)
+        del lp[50]
+        self.assertEqual(lp[3], "3")
+        self.assertEqual(len(lp), 99)
+        self.assertRaises(KeyError, lambda: lp[50])
+
+        # Keys other than strings also work with the default hash.
+        lp = LinearProbeTable()
+        lp[(1, 2)] = "pair"
+        lp[7] = "seven"
+        self.assertEqual(lp[(1, 2)], "pair")
+        self.assertEqual(lp[7], "seven")
+
+        dt = DoubleKeyTable()
+        dt.hash2 = lambda k, sub_table: k % sub_table.table_size
+        for i in range(20):
+            dt["May", i] = i
+        del dt["May", 5]
+        self.assertEqual(dt["May", 12], 12)
+        self.assertEqual(len(dt.keys("May")), 19)
+
+    @number("7.19")
+    def test_unsuccessful_stats(self):
+        # The estimated cost of a miss matches the misses actually looked up.
+        for policy in (LinearProbe(), DoubleHashProbe(), RobinHoodProbe()):
+            lp = LinearProbeTable(sizes=[1543], probe_policy=policy, track_stats=True)
+            for i in range(700):
+                lp["k" + str(i)] = i
+            for i in range(20000):
+                self.assertNotIn("m" + str(i), lp)
+            stats = lp.stats()
+            estimated, observed = stats["unsuccessful"], stats["lookups"]["unsuccessful"]
+            self.assertAlmostEqual(estimated["average"], observed["average"], delta=0.1)
+            if policy.robin_hood:
+                # Misses stop at the first entry closer to its home.
+                self.assertEqual(estimated["max"], observed["max"])
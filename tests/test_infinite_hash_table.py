@@ -1,7 +1,11 @@
+import sys
 import unittest
 from ed_utils.decorators import number
 
+from data_structures.referential_array import ArrayR
 from infinite_hash_table import InfiniteHashTable
+from radix_infinite_hash_table import RadixInfiniteHashTable
+from tests.workloads import random_word, random_workload
 
 
 class TestInfiniteHash(unittest.TestCase):
@@ -92,3 +96,147 @@ class TestInfiniteHash(unittest.TestCase):
             "mining"
         ]
         self.assertListEqual(res, expected)
+
+    @number("4.4")
+    def test_deep_prefixes(self):
+        ih = InfiniteHashTable()
+        # Deeper than the recursion limit.
+        prefix = "x" * (sys.getrecursionlimit() + 100)
+        ih[prefix + "a"] = 1
+        ih[prefix + "b"] = 2
+        ih[prefix] = 3
+        self.assertEqual(ih[prefix + "b"], 2)
+        self.assertEqual(ih.get_location(prefix + "a"), [16] * len(prefix) + [19])
+        self.assertEqual(ih.get_location(prefix), [16] * len(prefix) + [26])
+        del ih[prefix + "a"]
+        del ih[prefix]
+        self.assertEqual(ih.get_location(prefix + "b"), [16])
+        self.assertEqual(len(ih), 1)
+
+        ih = InfiniteHashTable()
+        expected = random_workload([ih], random_word("abc", 7), 3000, 0.5)
+        self.assertEqual(len(ih), len(expected))
+        for key, value in expected.items():
+            self.assertEqual(ih[key], value)
+        self.assertRaises(KeyError, lambda: ih["abcabca"])
+
+        # "a" and "{" share a position at every level.
+        ih = InfiniteHashTable()
+        ih["a"] = 1
+        self.assertRaises(ValueError, lambda: ih.__setitem__("{", 2))
+        self.assertEqual(ih.get_location("a"), [19])
+        self.assertEqual(len(ih), 1)
+
+    @number("4.7")
+    def test_iter_sorted(self):
+        ih = InfiniteHashTable()
+        expected = random_workload([ih], random_word("abcdxyz", 7), 3000, 0.5)
+        self.assertEqual(ih.sort_keys(), sorted(expected))
+        self.assertFalse(hasattr(ih, "keys"))
+
+        # Lazy, the first key is found without walking the whole table.
+        keys = ih.iter_sorted()
+        self.assertEqual(next(keys), min(expected))
+        self.assertEqual(list(InfiniteHashTable().iter_sorted()), [])
+        # A sub-table on its own.
+        sub_table = ih.array[ih.hash("a")][1]
+        self.assertEqual(ih.sort_keys(sub_table), sorted(key for key in expected if key[0] == "a"))
+
+        # Digits, capitals and punctuation share positions with letters.
+        ih = InfiniteHashTable()
+        keys = ["host1", "hosta", "a.com", "Zed", "xyz"]
+        for i, key in enumerate(keys):
+            ih[key] = i
+        self.assertEqual(ih.sort_keys(), sorted(keys))
+
+        for table_type in (InfiniteHashTable, RadixInfiniteHashTable):
+            ih = table_type()
+            # "a", "G" and "-" share a position, as do "b", "H" and ".".
+            expected = random_workload([ih], random_word("ab.1GH-x", 7), 3000, 0.5, skip_indistinguishable=True)
+            self.assertEqual(ih.sort_keys(), sorted(expected))
+
+    @number("4.9")
+    def test_prefix_queries(self):
+        ih = InfiniteHashTable()
+        for i, key in enumerate(["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger"]):
+            ih[key] = i
+        self.assertEqual(list(ih.keys_with_prefix("lin")), ["lin", "linger", "linked"])
+        self.assertEqual(list(ih.keys_with_prefix("li", limit=2)), ["limp", "lin"])
+        self.assertEqual(list(ih.keys_with_prefix("ja")), ["jake"])
+        self.assertEqual(list(ih.keys_with_prefix("jo")), [])
+        self.assertEqual(list(ih.keys_with_prefix("linkedin")), [])
+        self.assertEqual(list(ih.keys_with_prefix("")), ih.sort_keys())
+        self.assertEqual(ih.count_prefix("lin"), 3)
+        self.assertEqual(ih.count_prefix("l"), 5)
+        self.assertEqual(ih.count_prefix("min"), 2)
+        self.assertEqual(ih.count_prefix("ja"), 1)
+        self.assertEqual(ih.count_prefix("jo"), 0)
+        self.assertEqual(ih.count_prefix("x"), 0)
+        self.assertEqual(ih.count_prefix(""), 8)
+
+        ih = InfiniteHashTable()
+        expected = random_workload([ih], random_word("abcd", 7), 2000, 0.5)
+        for prefix in ["", "a", "ab", "abc", "dddd", "abcdab", "ca"]:
+            matches = sorted(key for key in expected if key.startswith(prefix))
+            self.assertEqual(list(ih.keys_with_prefix(prefix)), matches)
+            self.assertEqual(ih.count_prefix(prefix), len(matches))
+
+        # "." shares a position with "b".
+        ih = InfiniteHashTable()
+        ih["ab"] = 1
+        ih["a.x"] = 2
+        self.assertEqual(ih.count_prefix("ab"), 1)
+        self.assertEqual(list(ih.keys_with_prefix("ab")), ["ab"])
+        self.assertEqual(ih.count_prefix("a."), 1)
+        self.assertEqual(ih.count_prefix("a"), 2)
+
+        # The keys differ on levels the radix table skipped below the prefix.
+        radix = RadixInfiniteHashTable()
+        radix["w.bxy"] = 1
+        radix["wb.x"] = 2
+        self.assertEqual(list(radix.keys_with_prefix("w")), ["w.bxy", "wb.x"])
+        self.assertEqual(list(radix.keys_with_prefix("w")), radix.sort_keys())
+
+        for table_type in (InfiniteHashTable, RadixInfiniteHashTable):
+            ih = table_type()
+            # "a", "G" and "-" share a position, as do "b", "H" and ".".
+            expected = random_workload([ih], random_word("ab.1GH-x", 7), 3000, 0.5, skip_indistinguishable=True)
+            for prefix in ["", "a", "G", "ab", "a.", "aH", "-x", "b1", "xx", "Hb.", "a-a-"]:
+                matches = sorted(key for key in expected if key.startswith(prefix))
+                self.assertEqual(list(ih.keys_with_prefix(prefix)), matches)
+                self.assertEqual(ih.count_prefix(prefix), len(matches))
+
+    @number("4.11")
+    def test_sparse_nodes(self):
+        class FullTable(InfiniteHashTable):
+            __slots__ = ()
+            ARRAY_TYPE = ArrayR
+
+        ih = InfiniteHashTable()
+        full = FullTable()
+        keys = ["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger"]
+        for i, key in enumerate(keys):
+            ih[key] = i
+            full[key] = i
+        self.assertFalse(hasattr(ih, "__dict__"))
+        # No table has more than four slots taken, so none allocates them all.
+        self.assertIsNone(ih.array.array)
+        self.assertEqual(ih.array.size, 3)
+        sub_table = ih.array[ih.hash("l")][1]
+        self.assertIsNone(sub_table.array.array)
+        self.assertEqual(sub_table.array.size, 2)
+        ih["abc"] = 9
+        ih["zed"] = 10
+        self.assertIsNotNone(ih.array.array)
+        del ih["abc"]
+        del ih["zed"]
+        for key in keys:
+            self.assertEqual(ih.get_location(key), full.get_location(key))
+        self.assertEqual(ih.sort_keys(), full.sort_keys())
+
+        random_workload([ih, full], random_word("abcdefg", 5), 3000, 0.5)
+        self.assertEqual(len(ih), len(full))
+        self.assertEqual(ih.sort_keys(), full.sort_keys())
+        for key in full.sort_keys():
+            self.assertEqual(ih.get_location(key), full.get_location(key))
+            self.assertEqual(ih[key], full[key])
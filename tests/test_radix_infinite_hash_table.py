@@ -0,0 +1,95 @@
+import unittest
+from ed_utils.decorators import number
+
+from infinite_hash_table import InfiniteHashTable
+from radix_infinite_hash_table import RadixInfiniteHashTable
+from tests.workloads import random_word, random_workload
+
+
+def count_tables(table):
+    return 1 + sum(count_tables(entry[1]) for entry in table.array
+                   if entry is not None and isinstance(entry[1], InfiniteHashTable))
+
+
+class TestRadixInfiniteHash(unittest.TestCase):
+
+    @number("4.5")
+    def test_radix_example(self):
+        ih = RadixInfiniteHashTable()
+        ih["lin"] = 1
+        ih["leg"] = 2
+        ih["mine"] = 3
+        ih["linked"] = 4
+        self.assertEqual(ih.get_location("lin"), [4, 1, 6, 26])
+        self.assertEqual(ih.get_location("linked"), [4, 1, 6, 3])
+        self.assertEqual(ih.get_location("leg"), [4, 23])
+        self.assertEqual(ih.get_location("mine"), [5])
+        # "lin" and "linked" share "lin", so level 2 is skipped.
+        self.assertEqual(count_tables(ih), 3)
+        self.assertEqual(ih["linked"], 4)
+        self.assertRaises(KeyError, lambda: ih["lix"])
+        self.assertRaises(KeyError, lambda: ih.get_location("link"))
+
+        del ih["leg"]
+        self.assertEqual(ih.get_location("lin"), [4, 1, 6, 26])
+        self.assertEqual(count_tables(ih), 2)
+        del ih["linked"]
+        self.assertEqual(ih.get_location("lin"), [4])
+        self.assertEqual(len(ih), 2)
+
+        ih = RadixInfiniteHashTable()
+        prefix = "x" * 40
+        for suffix in ("alpha", "beta", "gamma"):
+            ih[prefix + suffix] = suffix
+        self.assertEqual(count_tables(ih), 2)
+        self.assertEqual(ih.get_location(prefix + "beta"), [16] * 40 + [20])
+
+    @number("4.6")
+    def test_radix_matches_levels(self):
+        ih = InfiniteHashTable()
+        radix = RadixInfiniteHashTable()
+        seen = set()
+        word = random_word("abcn", 9)
+
+        def make_key(rng):
+            key = word(rng)
+            seen.add(key)
+            return key
+
+        random_workload([ih, radix], make_key, 2000, 0.5)
+        self.assertEqual(len(radix), len(ih))
+        self.assertLessEqual(count_tables(radix), count_tables(ih))
+        for key in seen:
+            if key in ih:
+                self.assertEqual(radix[key], ih[key])
+                self.assertEqual(radix.get_location(key), ih.get_location(key))
+            else:
+                self.assertNotIn(key, radix)
+
+    @number("4.8")
+    def test_radix_sorted(self):
+        radix = RadixInfiniteHashTable()
+        keys = ["linked", "lin", "leg", "x" * 30 + "b", "x" * 30 + "a", "x" * 30, "mine"]
+        for i, key in enumerate(keys):
+            radix[key] = i
+        self.assertEqual(radix.sort_keys(), sorted(keys))
+
+    @number("4.10")
+    def test_radix_prefix_queries(self):
+        radix = RadixInfiniteHashTable()
+        keys = ["abcdex", "abcdey", "abcdez", "abq", "b"]
+        for i, key in enumerate(keys):
+            radix[key] = i
+        # "abz" parts ways with "abcde" on a skipped level.
+        self.assertEqual(radix.count_prefix("abz"), 0)
+        self.assertEqual(list(radix.keys_with_prefix("abz")), [])
+        self.assertEqual(radix.count_prefix("abc"), 3)
+        self.assertEqual(radix.count_prefix("ab"), 4)
+        self.assertEqual(list(radix.keys_with_prefix("abcd", limit=2)), ["abcdex", "abcdey"])
+
+        ih = InfiniteHashTable()
+        radix = RadixInfiniteHashTable()
+        random_workload([ih, radix], random_word("abcd", 9), 2000, 0.5)
+        for prefix in ["", "a", "ab", "abc", "dddd", "abcdab", "ca", "bbbbbbbb"]:
+            self.assertEqual(list(radix.keys_with_prefix(prefix)), list(ih.keys_with_prefix(prefix)))
+            self.assertEqual(radix.count_prefix(prefix), ih.count_prefix(prefix))
@@ -0,0 +1,69 @@
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.referential_array import ArrayR, SparseArrayR, TypedArrayR
+from tests.workloads import random_operations
+
+
+class TestReferentialArray(unittest.TestCase):
+
+    @number("7.14")
+    def test_bulk_operations(self):
+        a = ArrayR(6)
+        self.assertEqual(list(a), [None] * 6)
+        a.fill(0)
+        a[1:3] = ["x", "y"]
+        self.assertEqual(a[0:4], [0, "x", "y", 0])
+
+        b = ArrayR(4)
+        b.copy_from(a, start=1, other_start=1, length=3)
+        self.assertEqual(list(b), [None, "x", "y", 0])
+        b.fill(None, 2)
+        self.assertEqual(list(b), [None, "x", None, None])
+
+    @number("7.15")
+    def test_typed_bulk_operations(self):
+        t = TypedArrayR(4, "d")
+        t.fill(1.5, 1, 3)
+        self.assertEqual(list(t), [None, 1.5, 1.5, None])
+        u = TypedArrayR(4, "d")
+        u.copy_from(t)
+        u[0] = 2.0
+        self.assertEqual(list(u), [2.0, 1.5, 1.5, None])
+        u.fill(None)
+        self.assertEqual(list(u), [None] * 4)
+
+    @number("7.17")
+    def test_sparse_array(self):
+        s = SparseArrayR(27)
+        self.assertEqual(len(s), 27)
+        for index in (20, 3, 11, 0):
+            s[index] = str(index)
+        self.assertIsNone(s.array)
+        self.assertEqual(s.positions, (0, 3, 11, 20))
+        self.assertEqual(list(s.items()), [(0, "0"), (3, "3"), (11, "11"), (20, "20")])
+        s[3] = "three"
+        self.assertIsNone(s.array)
+
+        # A fifth object allocates the full array.
+        s[26] = "26"
+        self.assertIsNotNone(s.array)
+        self.assertEqual(s[3], "three")
+        self.assertIsNone(s[4])
+        # It stays full until down to SHRINK_SIZE objects.
+        s[0] = None
+        s[3] = None
+        self.assertIsNotNone(s.array)
+        s[11] = None
+        self.assertIsNone(s.array)
+        self.assertEqual(list(s.items()), [(20, "20"), (26, "26")])
+        self.assertEqual(s.size, 2)
+
+        s = SparseArrayR(27)
+        a = ArrayR(27)
+        for i, index, clear in random_operations(lambda rng: rng.randrange(27), 2000, 0.55, lambda index: True):
+            value = None if clear else i % 100
+            s[index] = value
+            a[index] = value
+            self.assertEqual(list(s), list(a))
+        self.assertEqual(s.size, sum(value is not None for value in a))
@@ -0,0 +1,32 @@
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.skip_list import SkipList
+from tests.workloads import random_operations
+
+
+class TestSkipList(unittest.TestCase):
+
+    @number("7.16")
+    def test_skip_list(self):
+        sl = SkipList(seed=1008)
+        expected = set()
+        for _, key, delete in random_operations(lambda rng: rng.randrange(500), 2000, 0.5, expected.__contains__):
+            if delete:
+                sl.remove(key)
+                expected.remove(key)
+            else:
+                self.assertEqual(sl.add(key), key not in expected)
+                expected.add(key)
+        self.assertEqual(list(sl), sorted(expected))
+        self.assertEqual(len(sl), len(expected))
+        self.assertEqual(list(sl.range(100, 200)), sorted(k for k in expected if 100 <= k < 200))
+        self.assertEqual(list(sl.iter_from(490)), sorted(k for k in expected if k >= 490))
+        self.assertRaises(KeyError, lambda: sl.remove(-1))
+        self.assertFalse(sl.discard(-1))
+
+        words = SkipList()
+        for word in ["car", "cat", "cab", "dog", "ca", "c"]:
+            words.add(word)
+        self.assertEqual(list(words.prefix("ca")), ["ca", "cab", "car", "cat"])
+        self.assertEqual(list(words.prefix("x")), [])
@@ -0,0 +1,47 @@
+import unittest
+from ed_utils.decorators import number
+
+from sorted_double_key_table import SortedDoubleKeyTable
+from tests.workloads import random_pair, random_workload
+
+
+class TestSortedDoubleKeyTable(unittest.TestCase):
+
+    @number("3.18")
+    def test_sorted_queries(self):
+        dt = SortedDoubleKeyTable()
+        dt["Tim", "Jen"] = 1
+        dt["Amy", "Ben"] = 2
+        dt["May", "Ben"] = 3
+        dt["May", "Bob"] = 4
+        dt["May", "Tom"] = 5
+        dt["Tim", "Bob"] = 6
+        dt["Max", "Al"] = 7
+
+        self.assertEqual(dt.keys_sorted(), ["Amy", "Max", "May", "Tim"])
+        self.assertEqual(dt.keys_sorted("May"), ["Ben", "Bob", "Tom"])
+        self.assertRaises(KeyError, lambda: dt.keys_sorted("Bob"))
+        self.assertEqual(dt.range("Ma", "Tim"), ["Max", "May"])
+        self.assertEqual(dt.range("Bo", "Z", "May"), ["Bob", "Tom"])
+        self.assertEqual(dt.prefix("Ma"), ["Max", "May"])
+        self.assertEqual(dt.prefix("B", "May"), ["Ben", "Bob"])
+
+        del dt["May", "Ben"]
+        del dt["Amy", "Ben"]
+        self.assertEqual(dt.keys_sorted(), ["Max", "May", "Tim"])
+        self.assertEqual(dt.prefix("B", "May"), ["Bob"])
+
+    @number("3.19")
+    def test_sorted_matches_table(self):
+        dt = SortedDoubleKeyTable()
+        random_workload([dt], random_pair(60, 10), 2000, 0.4)
+        dt.set_many([(("k" + str(i), "y"), i) for i in range(70)])
+        self.assertRaises(KeyError, lambda: dt.delete_many([("k0", "y"), ("k1", "y"), ("nope", "y")]))
+        dt["only", "x"] = 1
+        self.assertRaises(KeyError, lambda: dt.delete_many([("only", "x"), ("only", "missing")]))
+        self.assertNotIn("only", dt.key1_index)
+
+        self.assertEqual(dt.keys_sorted(), sorted(dt.keys()))
+        for key1 in dt.keys():
+            self.assertEqual(dt.keys_sorted(key1), sorted(dt.keys(key1)))
+        self.assertEqual(len(dt.pair_index), len(list(dt.iter_items())))
@@ -0,0 +1,78 @@
+"""
+Seeded random workloads shared by the tests.
+
+Each workload draws keys from a fixed seed, so a failing test replays the
+same operations every run.
+"""
+from __future__ import annotations
+
+import random
+from typing import Callable, Iterator
+
+
+def random_word(alphabet: str, max_length: int) -> Callable[[random.Random], str]:
+    """
+    Makes keys of 1 to max_length - 1 characters drawn from alphabet.
+    """
+    return lambda rng: "".join(rng.choice(alphabet) for _ in range(rng.randrange(1, max_length)))
+
+
+def random_pair(key1_count: int, key2_count: int) -> Callable[[random.Random], tuple[str, str]]:
+    """
+    Makes (key1, key2) pairs from key1_count top-level and key2_count bottom-level keys.
+    """
+    return lambda rng: ("k" + str(rng.randrange(key1_count)), "x" + str(rng.randrange(key2_count)))
+
+
+def random_operations(
+    make_key: Callable[[random.Random], object],
+    operations: int,
+    delete_chance: float,
+    contains: Callable[[object], bool],
+    seed: int = 1008,
+) -> Iterator[tuple[int, object, bool]]:
+    """
+    Yields (i, key, delete) for each operation.
+    A key is deleted with delete_chance when contains(key), and set otherwise.
+    contains is checked lazily, so it sees the caller's changes so far.
+    """
+    rng = random.Random(seed)
+    for i in range(operations):
+        key = make_key(rng)
+        yield i, key, contains(key) and rng.random() < delete_chance
+
+
+def random_workload(
+    tables: list,
+    make_key: Callable[[random.Random], object],
+    operations: int,
+    delete_chance: float,
+    seed: int = 1008,
+    skip_indistinguishable: bool = False,
+    check: Callable[[], None] | None = None,
+) -> dict:
+    """
+    Sets key -> i or deletes key in every table, and returns the pairs they should hold.
+
+    :arg skip_indistinguishable: Skip keys a table rejects with ValueError,
+        as InfiniteHashTable does for a key sharing every position with another.
+    :arg check: Called after every operation.
+    """
+    expected = {}
+    for i, key, delete in random_operations(make_key, operations, delete_chance, expected.__contains__, seed):
+        if delete:
+            for table in tables:
+                del table[key]
+            del expected[key]
+        else:
+            try:
+                for table in tables:
+                    table[key] = i
+            except ValueError:
+                if not skip_indistinguishable:
+                    raise
+            else:
+                expected[key] = i
+        if check is not None:
+            check()
+    return expected